@@ -0,0 +1,358 @@
+"""Inter-annotator agreement over message-level category labels.
+
+Each rater is an annotation set: a directory laid out like `annotations/`
+(for example the double-coded `annotations copy/`) or an in-memory
+``{transcript: annotation file}`` mapping. Every annotation's ``categories``
+are projected onto the messages listed in its ``messageIndices``, which
+turns each rater into a boolean tensor of shape (messages, categories); a
+message a rater did not annotate counts as "category not assigned".
+
+Agreement is computed per category, per transcript and pooled, with all
+counts reduced by numpy over the whole corpus at once:
+
+- Cohen's kappa for every pair of raters (and their mean, Light's kappa)
+- Fleiss' kappa over messages rated by every rater
+- Krippendorff's alpha (nominal), which also tolerates raters that did not
+  annotate some transcripts
+
+Runs of consecutive messages where raters disagree are listed, together with
+the annotation ids involved, to drive adjudication.
+
+    python agreement.py annotations "annotations copy" [--json report.json]
+"""
+import argparse
+import json
+from itertools import combinations
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+AnnotationSet = Dict[str, dict]
+
+
+def load_annotation_dir(directory: Path) -> AnnotationSet:
+    """Read every annotation file in a directory into {transcript: data}"""
+    annotation_set = {}
+    for annotation_file in sorted(directory.glob("*.json")):
+        if annotation_file.name == "categories.json":
+            continue
+        with open(annotation_file, "r", encoding="utf-8") as f:
+            annotation_set[annotation_file.stem] = json.load(f)
+    return annotation_set
+
+
+class ProjectedLabels:
+    """Annotation sets projected onto message indices.
+
+    ``labels[r, u, c]`` is True when rater r assigned category c to unit
+    (message) u, and ``present[r, u]`` when rater r annotated the transcript
+    unit u belongs to. Units are laid out transcript after transcript;
+    ``offsets[t]`` is the first unit of transcript t.
+    """
+
+    def __init__(
+        self,
+        sets: Dict[str, AnnotationSet],
+        message_counts: Optional[Dict[str, int]] = None,
+        transcripts: Optional[Sequence[str]] = None,
+        categories: Optional[Sequence[str]] = None,
+    ):
+        message_counts = message_counts or {}
+        self.raters = list(sets)
+        self.sets = sets
+
+        if transcripts is None:
+            transcripts = sorted({t for s in sets.values() for t in s})
+        if categories is None:
+            categories = sorted({
+                c
+                for s in sets.values()
+                for data in s.values()
+                for ann in data.get("annotations", [])
+                for c in ann.get("categories") or []
+            })
+        self.categories = list(categories)
+        category_ids = {c: i for i, c in enumerate(self.categories)}
+
+        sizes = []
+        for t in transcripts:
+            size = message_counts.get(t)
+            if size is None:
+                indices = [
+                    i
+                    for s in sets.values()
+                    for ann in s.get(t, {}).get("annotations", [])
+                    for i in ann.get("messageIndices", [])
+                ]
+                size = max(indices) + 1 if indices else 0
+            sizes.append(size)
+        # Transcripts without any message cannot contribute units
+        self.transcripts = [t for t, n in zip(transcripts, sizes) if n > 0]
+        self.sizes = np.array([n for n in sizes if n > 0], dtype=np.int64)
+        self.offsets = np.concatenate(([0], np.cumsum(self.sizes)[:-1])).astype(np.int64)
+        self.unit_transcript = np.repeat(np.arange(len(self.transcripts)), self.sizes)
+
+        units = int(self.sizes.sum())
+        self.labels = np.zeros((len(self.raters), units, len(self.categories)), dtype=bool)
+        self.present = np.zeros((len(self.raters), units), dtype=bool)
+        for r, rater in enumerate(self.raters):
+            for t, transcript in enumerate(self.transcripts):
+                data = sets[rater].get(transcript)
+                if data is None:
+                    continue
+                start, size = self.offsets[t], self.sizes[t]
+                self.present[r, start:start + size] = True
+                for ann in data.get("annotations", []):
+                    cats = [category_ids[c] for c in ann.get("categories") or [] if c in category_ids]
+                    idx = np.asarray(ann.get("messageIndices", []), dtype=np.int64)
+                    idx = idx[(idx >= 0) & (idx < size)]
+                    if cats and idx.size:
+                        self.labels[r][np.ix_(start + idx, cats)] = True
+
+
+def _group_sums(values: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    """Sum per-unit values (units, ...) into per-transcript totals (transcripts, ...)"""
+    return np.add.reduceat(values, offsets, axis=0)
+
+
+def _ratio(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(denominator != 0, numerator / np.where(denominator != 0, denominator, 1), np.nan)
+
+
+def _kappa(observed: np.ndarray, expected: np.ndarray) -> np.ndarray:
+    return _ratio(observed - expected, 1 - expected)
+
+
+def compute_statistics(projected: ProjectedLabels) -> Dict[str, np.ndarray]:
+    """Cohen, Fleiss and Krippendorff statistics as arrays of shape (transcripts + 1, categories + 1).
+
+    Row -1 pools all transcripts and column -1 pools all categories.
+    """
+    labels, present, offsets = projected.labels, projected.present, projected.offsets
+    raters = labels.shape[0]
+
+    def totals(per_unit: np.ndarray) -> np.ndarray:
+        # (units, categories) -> (transcripts + 1, categories + 1)
+        grouped = _group_sums(per_unit.astype(np.float64), offsets)
+        grouped = np.vstack([grouped, grouped.sum(axis=0, keepdims=True)])
+        return np.hstack([grouped, grouped.sum(axis=1, keepdims=True)])
+
+    rated = labels & present[:, :, None]
+    raters_per_unit = present.sum(axis=0)  # (units,)
+    assigned = rated.sum(axis=0)  # (units, categories)
+    not_assigned = raters_per_unit[:, None] - assigned
+    categories = labels.shape[2]
+
+    statistics = {}
+
+    # Krippendorff's alpha (nominal) from the coincidence matrix of pairable units
+    pairable = raters_per_unit >= 2
+    weight = np.where(pairable, 1.0 / np.maximum(raters_per_unit - 1, 1), 0.0)[:, None]
+    o_01 = totals(assigned * not_assigned * weight)
+    o_11 = totals(assigned * (assigned - 1) * weight)
+    o_00 = totals(not_assigned * (not_assigned - 1) * weight)
+    n_1, n_0 = o_11 + o_01, o_00 + o_01
+    n = n_0 + n_1
+    statistics["alpha"] = 1 - _ratio((n - 1) * o_01, n_0 * n_1)
+
+    # Fleiss' kappa over units rated by every rater
+    complete = (raters_per_unit == raters)[:, None]
+    units = totals(np.broadcast_to(complete, assigned.shape))
+    agreement = (assigned * (assigned - 1) + not_assigned * (not_assigned - 1)) / max(raters * (raters - 1), 1)
+    p_bar = _ratio(totals(agreement * complete), units)
+    p_1 = _ratio(totals(assigned * complete), units * raters)
+    statistics["fleiss"] = _kappa(p_bar, p_1 ** 2 + (1 - p_1) ** 2)
+    statistics["units"] = units
+
+    # Cohen's kappa for every pair of raters, and their mean
+    pairs = {}
+    for a, b in combinations(range(raters), 2):
+        both = (present[a] & present[b])[:, None]
+        count = totals(np.broadcast_to(both, (labels.shape[1], categories)))
+        p_o = _ratio(totals((labels[a] == labels[b]) & both), count)
+        p_a = _ratio(totals(labels[a] & both), count)
+        p_b = _ratio(totals(labels[b] & both), count)
+        pairs[(a, b)] = _kappa(p_o, p_a * p_b + (1 - p_a) * (1 - p_b))
+    statistics["cohen_pairs"] = pairs
+    if pairs:
+        with np.errstate(invalid="ignore"):
+            stacked = np.stack(list(pairs.values()))
+            valid = ~np.isnan(stacked)
+            statistics["cohen"] = _ratio(np.where(valid, stacked, 0).sum(axis=0), valid.sum(axis=0))
+    else:
+        statistics["cohen"] = np.full(units.shape, np.nan)
+    statistics["positives"] = totals(assigned)
+    return statistics
+
+
+def find_disagreements(projected: ProjectedLabels, limit: Optional[int] = None) -> List[dict]:
+    """Runs of consecutive messages where raters disagree on a category"""
+    labels, present = projected.labels, projected.present
+    rated = labels & present[:, :, None]
+    raters_per_unit = present.sum(axis=0)
+    assigned = rated.sum(axis=0)
+    mask = (raters_per_unit[:, None] >= 2) & (assigned > 0) & (assigned < raters_per_unit[:, None])
+
+    disagreements: List[dict] = []
+    # Category-major order, so runs of units are consecutive
+    for c, u in np.argwhere(mask.T):
+        t = projected.unit_transcript[u]
+        index = int(u - projected.offsets[t])
+        pattern = (tuple(rated[:, u, c]), tuple(present[:, u]))
+        last = disagreements[-1] if disagreements else None
+        if (
+            last is not None
+            and last["_key"] == (c, t, pattern)
+            and last["endIndex"] == index - 1
+        ):
+            last["endIndex"] = index
+            continue
+        if limit is not None and len(disagreements) >= limit:
+            break
+        disagreements.append({
+            "_key": (c, t, pattern),
+            "transcript": projected.transcripts[t],
+            "category": projected.categories[c],
+            "startIndex": index,
+            "endIndex": index,
+            "assignedBy": [projected.raters[r] for r in range(len(projected.raters)) if pattern[0][r]],
+            "notAssignedBy": [
+                projected.raters[r]
+                for r in range(len(projected.raters))
+                if pattern[1][r] and not pattern[0][r]
+            ],
+        })
+
+    for item in disagreements:
+        del item["_key"]
+        span = set(range(item["startIndex"], item["endIndex"] + 1))
+        item["annotations"] = {
+            rater: [
+                ann.get("id")
+                for ann in projected.sets[rater].get(item["transcript"], {}).get("annotations", [])
+                if span.intersection(ann.get("messageIndices", []))
+            ]
+            for rater in item["assignedBy"] + item["notAssignedBy"]
+        }
+    return disagreements
+
+
+def _value(x) -> Optional[float]:
+    x = float(x)
+    return None if np.isnan(x) else round(x, 4)
+
+
+def _cell(statistics: Dict[str, np.ndarray], raters: List[str], row: int, col: int) -> dict:
+    return {
+        "cohen": _value(statistics["cohen"][row, col]),
+        "cohenPairs": {
+            f"{raters[a]} | {raters[b]}": _value(k[row, col])
+            for (a, b), k in statistics["cohen_pairs"].items()
+        },
+        "fleiss": _value(statistics["fleiss"][row, col]),
+        "alpha": _value(statistics["alpha"][row, col]),
+        "units": int(statistics["units"][row, col]),
+        "positives": int(statistics["positives"][row, col]),
+    }
+
+
+def agreement_report(
+    sets: Dict[str, AnnotationSet],
+    message_counts: Optional[Dict[str, int]] = None,
+    transcripts: Optional[Sequence[str]] = None,
+    categories: Optional[Sequence[str]] = None,
+    disagreement_limit: Optional[int] = 1000,
+) -> dict:
+    """Agreement per category, per transcript and overall, plus disagreements"""
+    if len(sets) < 2:
+        raise ValueError("At least two annotation sets are needed")
+    projected = ProjectedLabels(sets, message_counts, transcripts, categories)
+    if not projected.categories or not projected.transcripts:
+        raise ValueError("No categorised annotations to compare")
+    statistics = compute_statistics(projected)
+    raters = projected.raters
+
+    return {
+        "raters": raters,
+        "transcripts": projected.transcripts,
+        "categories": projected.categories,
+        "overall": _cell(statistics, raters, -1, -1),
+        "perCategory": {
+            c: _cell(statistics, raters, -1, j) for j, c in enumerate(projected.categories)
+        },
+        "perTranscript": {
+            t: {
+                "overall": _cell(statistics, raters, i, -1),
+                "perCategory": {
+                    c: _cell(statistics, raters, i, j)
+                    for j, c in enumerate(projected.categories)
+                },
+            }
+            for i, t in enumerate(projected.transcripts)
+        },
+        "disagreements": find_disagreements(projected, disagreement_limit),
+    }
+
+
+def load_sets(sources: Sequence[Union[str, Path]]) -> Dict[str, AnnotationSet]:
+    sets = {}
+    for source in sources:
+        directory = Path(source)
+        if not directory.is_dir():
+            raise FileNotFoundError(f"Annotation directory not found: {directory}")
+        sets[directory.name] = load_annotation_dir(directory)
+    return sets
+
+
+def segmented_message_counts(segmented_dir: Path) -> Dict[str, int]:
+    """Number of messages of every segmented transcript"""
+    from index_cache import build_message_map, load_segments
+
+    counts = {}
+    for segment_dir in segmented_dir.glob("*/"):
+        # Dot-folders are not transcripts (e.g. left over from an interrupted write)
+        if segment_dir.is_dir() and not segment_dir.name.startswith("."):
+            messages = build_message_map(load_segments(segment_dir))
+            counts[segment_dir.name] = max(messages) + 1 if messages else 0
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inter-annotator agreement between annotation directories")
+    parser.add_argument("directories", nargs="+", help="Two or more annotation directories")
+    parser.add_argument("--segmented-dir", default="segmented", help="Used for the number of messages per transcript")
+    parser.add_argument("--transcript", action="append", help="Only these transcripts (repeatable)")
+    parser.add_argument("--category", action="append", help="Only these categories (repeatable)")
+    parser.add_argument("--json", help="Write the full report, including disagreements, to this file")
+    args = parser.parse_args()
+
+    report = agreement_report(
+        load_sets(args.directories),
+        segmented_message_counts(Path(args.segmented_dir)),
+        args.transcript,
+        args.category,
+        disagreement_limit=None,
+    )
+
+    def fmt(x):
+        return "   -  " if x is None else f"{x:6.3f}"
+
+    print(f"Raters: {', '.join(report['raters'])}; {len(report['transcripts'])} transcripts")
+    print(f"{'category':<30} {'cohen':>6} {'fleiss':>6} {'alpha':>6} {'units':>7} {'pos':>6}")
+    rows = list(report["perCategory"].items()) + [("(all categories)", report["overall"])]
+    for label, cell in rows:
+        print(
+            f"{label[:30]:<30} {fmt(cell['cohen'])} {fmt(cell['fleiss'])} {fmt(cell['alpha'])} "
+            f"{cell['units']:>7} {cell['positives']:>6}"
+        )
+    print(f"{len(report['disagreements'])} disagreement runs")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
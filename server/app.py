@@ -1,14 +1,42 @@
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import Body, FastAPI, File, Form, HTTPException, Query, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Dict, List, Optional, Union
 from datetime import datetime
+from contextlib import asynccontextmanager
 import json
 import os
+import threading
+import uuid
 from pathlib import Path
 
-app = FastAPI(title="Transcript Annotator API")
+from agreement import agreement_report, load_annotation_dir
+from deid import Scrubber, load_name_map
+from index_cache import IndexCache, file_signature
+from ingest import UPLOAD_DIR, IngestWorkers, JobQueue
+from locking import FileLocks, GenerationCounter, atomic_write_text
+from segmenters import SEGMENTERS
+from similarity import SimilarityIndex
+from time_index import TimeSummary, parse_time, speaker_key
+from transcript_parser import ParseCache
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Warm the in-memory indexes from the last snapshot, refresh stale ones in the background"""
+    index_cache.load_snapshot()
+    threading.Thread(target=warm_indexes, name="index-warm", daemon=True).start()
+    ingest_workers.start()
+    yield
+    ingest_workers.stop()
+    try:
+        index_cache.save_snapshot()
+    except OSError as e:
+        print(f"Could not write index snapshot: {e}")
+
+
+app = FastAPI(title="Transcript Annotator API", lifespan=lifespan)
 
 # Enable CORS for browser requests
 app.add_middleware(
@@ -27,6 +55,10 @@ class TranscriptMessage(BaseModel):
     content: str
 
 
+class IndexedTranscriptMessage(TranscriptMessage):
+    index: int  # Global message index within the transcript
+
+
 class TranscriptSegment(BaseModel):
     start_index: int
     end_index: int
@@ -62,77 +94,86 @@ class AnnotationFile(BaseModel):
     lastModified: str
 
 
+class AnnotationSet(BaseModel):
+    name: str
+    annotations: Dict[str, dict]  # transcript name -> annotation file content
+
+
+class AgreementRequest(BaseModel):
+    # Annotation directories next to app.py (e.g. "annotations copy") or inline sets
+    sets: List[Union[str, AnnotationSet]]
+    transcripts: Optional[List[str]] = None
+    categories: Optional[List[str]] = None
+    disagreementLimit: Optional[int] = 1000
+
+
 # Ensure directories exist
 TRANSCRIPTS_DIR = Path("transcripts")
 ANNOTATIONS_DIR = Path("annotations")
 # ANNOTATIONS_DIR = Path("annotation_offset")
 SEGMENTED_DIR = Path("segmented")
+CACHE_DIR = Path("cache")
 TRANSCRIPTS_DIR.mkdir(exist_ok=True)
 ANNOTATIONS_DIR.mkdir(exist_ok=True)
 SEGMENTED_DIR.mkdir(exist_ok=True)
 CATEGORIES_FILE = ANNOTATIONS_DIR / "categories.json"
+DE_ID_FILE = Path("de_id")
+
+# Shared by every worker process: annotation/category writes are serialised by
+# file locks and announced to the other workers' caches through generations
+file_locks = FileLocks(CACHE_DIR / "locks")
+generations = GenerationCounter(CACHE_DIR / "state.db")
+index_cache = IndexCache(
+    SEGMENTED_DIR, ANNOTATIONS_DIR, CACHE_DIR / "index_snapshot.json", generations
+)
+parse_cache = ParseCache()
+similarity_index = SimilarityIndex()
 
 
-def parse_transcript(content: str) -> List[TranscriptMessage]:
-    """Parse transcript content into structured messages"""
-    messages = []
-    lines = content.split("\n")
-    current_message = None
-
-    for line in lines:
-        line = line.strip()
-
-        # Check if line matches speaker pattern: [Speaker Name] hh:mm:ss
-        import re
-
-        speaker_match = re.match(r"^\[([^\]]+)\]\s+(\d{1,2}:\d{2}:\d{2})$", line)
-
-        if speaker_match:
-            # If we were building a previous message, save it
-            if current_message:
-                # Join content lines and clean up extra empty lines
-                content_text = "\n".join(current_message["content"]).strip()
-                if content_text:  # Only add messages with actual content
-                    messages.append(
-                        TranscriptMessage(
-                            speaker=current_message["speaker"],
-                            timestamp=current_message["timestamp"],
-                            content=content_text,
-                        )
-                    )
-
-            # Start a new message
-            current_message = {
-                "speaker": speaker_match.group(1),
-                "timestamp": speaker_match.group(2),
-                "content": [],
-            }
-        elif current_message and line != "":
-            # Add content line to current message
-            current_message["content"].append(line)
-        elif current_message and line == "":
-            # Empty line - add spacing to content
-            current_message["content"].append("")
-
-    # Don't forget the last message
-    if current_message:
-        content_text = "\n".join(current_message["content"]).strip()
-        if content_text:  # Only add messages with actual content
-            messages.append(
-                TranscriptMessage(
-                    speaker=current_message["speaker"],
-                    timestamp=current_message["timestamp"],
-                    content=content_text,
-                )
-            )
+def load_annotations_or_none(name: str) -> Optional[dict]:
+    try:
+        return index_cache.get_annotations(name)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def refresh_similarity_index() -> None:
+    """Re-sync the similarity index only if some worker wrote annotations since the last sync"""
+    similarity_index.refresh(
+        lambda: generations.get("annotations"), index_cache.annotation_names, load_annotations_or_none
+    )
+
+
+def warm_indexes() -> None:
+    index_cache.warm()
+    refresh_similarity_index()
+
+
+_scrubber = {"signature": None, "scrubber": None}
+
+
+def get_scrubber() -> Scrubber:
+    """Name scrubber for the de_id list, rebuilt when the list changes"""
+    signature = file_signature(DE_ID_FILE)
+    if signature is None:
+        raise HTTPException(status_code=500, detail="De-identification name list not found")
+    if _scrubber["signature"] != signature:
+        _scrubber["scrubber"] = Scrubber(load_name_map(DE_ID_FILE))
+        _scrubber["signature"] = signature
+    return _scrubber["scrubber"]
 
-    return messages
+
+# Uploaded transcripts are parsed and segmented by a background process pool
+ingest_queue = JobQueue(CACHE_DIR / "jobs.db")
+ingest_workers = IngestWorkers(
+    ingest_queue, concurrency=int(os.environ.get("INGEST_WORKERS", 2))
+)
 
 
 def load_categories() -> List[Category]:
     """Load categories from disk, creating file if missing"""
     if not CATEGORIES_FILE.exists():
-        CATEGORIES_FILE.write_text("[]", encoding="utf-8")
+        atomic_write_text(CATEGORIES_FILE, "[]")
         return []
     with open(CATEGORIES_FILE, "r", encoding="utf-8") as f:
         raw = json.load(f)
@@ -140,10 +181,33 @@ def load_categories() -> List[Category]:
 
 
 def save_categories(categories: List[Category]) -> None:
-    CATEGORIES_FILE.write_text(
+    """Write categories; callers hold the categories file lock"""
+    atomic_write_text(
+        CATEGORIES_FILE,
         json.dumps([c.dict() for c in categories], indent=2, ensure_ascii=False),
-        encoding="utf-8",
     )
+    generations.bump("categories")
+
+
+def note_annotation_change(transcript_name: str, data: Optional[dict]) -> None:
+    """Apply a local annotation write to the similarity index and bump the corpus-wide generation"""
+    similarity_index.record_write(transcript_name, data, lambda: generations.bump("annotations"))
+
+
+def write_annotation_file(file_path: Path, data: dict) -> None:
+    """Write an annotation file and refresh its cached copy; callers hold the file's lock"""
+    atomic_write_text(file_path, json.dumps(data, indent=2, ensure_ascii=False))
+    generations.bump("annotations:" + file_path.stem)
+    index_cache.put_annotations(file_path.stem, data)
+    note_annotation_change(file_path.stem, data)
+
+
+def check_transcript_name(transcript_name: str) -> None:
+    """categories.json sits next to the annotation files and must not be addressed as a transcript"""
+    if transcript_name == CATEGORIES_FILE.stem:
+        raise HTTPException(
+            status_code=400, detail=f"'{transcript_name}' is reserved and cannot be used as a transcript name"
+        )
 
 
 def ensure_annotation_file(transcript_name: str) -> Path:
@@ -155,47 +219,47 @@ def ensure_annotation_file(transcript_name: str) -> Path:
             "annotations": [],
             "lastModified": None,
         }
-        file_path.write_text(json.dumps(empty, indent=2), encoding="utf-8")
+        write_annotation_file(file_path, empty)
     return file_path
 
 
 def add_category_to_annotation(transcript_name: str, annotation_id: int, category_label: str):
-    file_path = ensure_annotation_file(transcript_name)
-    with open(file_path, "r", encoding="utf-8") as f:
-        data = json.load(f)
+    with file_locks.lock(ANNOTATIONS_DIR / (transcript_name + ".json")):
+        file_path = ensure_annotation_file(transcript_name)
+        with open(file_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
 
-    updated = False
-    for ann in data.get("annotations", []):
-        if ann.get("id") == annotation_id:
-            ann.setdefault("categories", [])
-            if category_label not in ann["categories"]:
-                ann["categories"].append(category_label)
-                updated = True
-            break
+        updated = False
+        for ann in data.get("annotations", []):
+            if ann.get("id") == annotation_id:
+                ann.setdefault("categories", [])
+                if category_label not in ann["categories"]:
+                    ann["categories"].append(category_label)
+                    updated = True
+                break
 
-    if updated:
-        data["lastModified"] = datetime.now().isoformat()
-        with open(file_path, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        if updated:
+            data["lastModified"] = datetime.now().isoformat()
+            write_annotation_file(file_path, data)
 
 
 def remove_category_from_annotation(transcript_name: str, annotation_id: int, category_label: str):
-    file_path = ensure_annotation_file(transcript_name)
-    with open(file_path, "r", encoding="utf-8") as f:
-        data = json.load(f)
+    with file_locks.lock(ANNOTATIONS_DIR / (transcript_name + ".json")):
+        file_path = ensure_annotation_file(transcript_name)
+        with open(file_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
 
-    updated = False
-    for ann in data.get("annotations", []):
-        if ann.get("id") == annotation_id:
-            if "categories" in ann and category_label in ann["categories"]:
-                ann["categories"] = [c for c in ann["categories"] if c != category_label]
-                updated = True
-            break
+        updated = False
+        for ann in data.get("annotations", []):
+            if ann.get("id") == annotation_id:
+                if "categories" in ann and category_label in ann["categories"]:
+                    ann["categories"] = [c for c in ann["categories"] if c != category_label]
+                    updated = True
+                break
 
-    if updated:
-        data["lastModified"] = datetime.now().isoformat()
-        with open(file_path, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        if updated:
+            data["lastModified"] = datetime.now().isoformat()
+            write_annotation_file(file_path, data)
 
 
 def rename_category_in_annotations(old_label: str, new_label: str):
@@ -203,20 +267,20 @@ def rename_category_in_annotations(old_label: str, new_label: str):
     for ann_file in ANNOTATIONS_DIR.glob("*.json"):
         if ann_file.name == "categories.json":
             continue
-        with open(ann_file, "r", encoding="utf-8") as f:
-            data = json.load(f)
+        with file_locks.lock(ann_file):
+            with open(ann_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
 
-        changed = False
-        for ann in data.get("annotations", []):
-            if "categories" in ann:
-                if old_label in ann["categories"]:
-                    ann["categories"] = [new_label if c == old_label else c for c in ann["categories"]]
-                    changed = True
+            changed = False
+            for ann in data.get("annotations", []):
+                if "categories" in ann:
+                    if old_label in ann["categories"]:
+                        ann["categories"] = [new_label if c == old_label else c for c in ann["categories"]]
+                        changed = True
 
-        if changed:
-            data["lastModified"] = datetime.now().isoformat()
-            with open(ann_file, "w", encoding="utf-8") as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
+            if changed:
+                data["lastModified"] = datetime.now().isoformat()
+                write_annotation_file(ann_file, data)
 
 
 def remove_category_globally(label: str):
@@ -224,19 +288,19 @@ def remove_category_globally(label: str):
     for ann_file in ANNOTATIONS_DIR.glob("*.json"):
         if ann_file.name == "categories.json":
             continue
-        with open(ann_file, "r", encoding="utf-8") as f:
-            data = json.load(f)
-
-        changed = False
-        for ann in data.get("annotations", []):
-            if "categories" in ann and label in ann["categories"]:
-                ann["categories"] = [c for c in ann["categories"] if c != label]
-                changed = True
+        with file_locks.lock(ann_file):
+            with open(ann_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+
+            changed = False
+            for ann in data.get("annotations", []):
+                if "categories" in ann and label in ann["categories"]:
+                    ann["categories"] = [c for c in ann["categories"] if c != label]
+                    changed = True
 
-        if changed:
-            data["lastModified"] = datetime.now().isoformat()
-            with open(ann_file, "w", encoding="utf-8") as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
+            if changed:
+                data["lastModified"] = datetime.now().isoformat()
+                write_annotation_file(ann_file, data)
 
 
 def sync_category_assignments(label: str, assignments: List[CategoryAssignment]):
@@ -250,26 +314,26 @@ def sync_category_assignments(label: str, assignments: List[CategoryAssignment])
         if ann_file.name == "categories.json":
             continue
         transcript_name = ann_file.stem
-        with open(ann_file, "r", encoding="utf-8") as f:
-            data = json.load(f)
+        with file_locks.lock(ann_file):
+            with open(ann_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+
+            changed = False
+            for ann in data.get("annotations", []):
+                ann.setdefault("categories", [])
+                should_have = ann.get("id") in assignment_map.get(transcript_name, set())
+                has_label = label in ann["categories"]
+
+                if should_have and not has_label:
+                    ann["categories"].append(label)
+                    changed = True
+                elif not should_have and has_label:
+                    ann["categories"] = [c for c in ann["categories"] if c != label]
+                    changed = True
 
-        changed = False
-        for ann in data.get("annotations", []):
-            ann.setdefault("categories", [])
-            should_have = ann.get("id") in assignment_map.get(transcript_name, set())
-            has_label = label in ann["categories"]
-
-            if should_have and not has_label:
-                ann["categories"].append(label)
-                changed = True
-            elif not should_have and has_label:
-                ann["categories"] = [c for c in ann["categories"] if c != label]
-                changed = True
-
-        if changed:
-            data["lastModified"] = datetime.now().isoformat()
-            with open(ann_file, "w", encoding="utf-8") as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
+            if changed:
+                data["lastModified"] = datetime.now().isoformat()
+                write_annotation_file(ann_file, data)
 
 
 @app.get("/api/categories", response_model=List[Category])
@@ -280,26 +344,32 @@ async def list_categories():
         raise HTTPException(status_code=500, detail=f"Error reading categories: {str(e)}")
 
 
+# Handlers that take file locks are plain functions so FastAPI runs them in its
+# threadpool: waiting on another worker's flock must not block the event loop
+
 @app.post("/api/categories", response_model=Category)
-async def create_category(category: Category):
+def create_category(category: Category):
+    for assignment in category.annotations:
+        check_transcript_name(assignment.transcriptFile)
     try:
-        categories = load_categories()
+        with file_locks.lock(CATEGORIES_FILE):
+            categories = load_categories()
 
-        # Ensure label is unique
-        if any(c.label == category.label for c in categories):
-            raise HTTPException(status_code=400, detail="Category label already exists")
+            # Ensure label is unique
+            if any(c.label == category.label for c in categories):
+                raise HTTPException(status_code=400, detail="Category label already exists")
 
-        # Persist category
-        categories.append(category)
-        save_categories(categories)
+            # Persist category
+            categories.append(category)
+            save_categories(categories)
 
-        # Add category label to referenced annotations
-        for assignment in category.annotations:
-            add_category_to_annotation(
-                assignment.transcriptFile, assignment.annotationId, category.label
-            )
+            # Add category label to referenced annotations
+            for assignment in category.annotations:
+                add_category_to_annotation(
+                    assignment.transcriptFile, assignment.annotationId, category.label
+                )
 
-        return category
+            return category
     except HTTPException:
         raise
     except Exception as e:
@@ -307,34 +377,36 @@ async def create_category(category: Category):
 
 
 @app.put("/api/categories", response_model=Category)
-async def update_category(request: Request):
+def update_category(payload: dict = Body(...)):
     """Update a category's label and assignments. Renames will propagate to annotations."""
     try:
-        categories = load_categories()
-        request = await request.json()
-        label = request.get("label")
-        category = Category(**request.get("category"))
+        label = payload.get("label")
+        category = Category(**payload.get("category"))
+        for assignment in category.annotations:
+            check_transcript_name(assignment.transcriptFile)
         print(label, category.annotations)
-        target_idx = next((i for i, c in enumerate(categories) if c.label == label), None)
-        if target_idx is None:
-            raise HTTPException(status_code=404, detail="Category not found")
+        with file_locks.lock(CATEGORIES_FILE):
+            categories = load_categories()
+            target_idx = next((i for i, c in enumerate(categories) if c.label == label), None)
+            if target_idx is None:
+                raise HTTPException(status_code=404, detail="Category not found")
 
-        # If renaming, ensure new label is unique
-        if category.label != label and any(c.label == category.label for c in categories):
-            raise HTTPException(status_code=400, detail="Category label already exists")
+            # If renaming, ensure new label is unique
+            if category.label != label and any(c.label == category.label for c in categories):
+                raise HTTPException(status_code=400, detail="Category label already exists")
 
-        # Apply rename in annotations if needed
-        if category.label != label:
-            rename_category_in_annotations(label, category.label)
+            # Apply rename in annotations if needed
+            if category.label != label:
+                rename_category_in_annotations(label, category.label)
 
-        # Sync assignments to annotations
-        sync_category_assignments(category.label, category.annotations)
+            # Sync assignments to annotations
+            sync_category_assignments(category.label, category.annotations)
 
-        # Persist category definition
-        categories[target_idx] = category
-        save_categories(categories)
+            # Persist category definition
+            categories[target_idx] = category
+            save_categories(categories)
 
-        return category
+            return category
     except HTTPException as e:
         print(e)
         raise
@@ -344,22 +416,23 @@ async def update_category(request: Request):
 
 
 @app.delete("/api/categories/{label}")
-async def delete_category(label: str):
+def delete_category(label: str):
     """Delete a category and remove it from all annotations."""
     try:
-        categories = load_categories()
-        remaining = [c for c in categories if c.label != label]
+        with file_locks.lock(CATEGORIES_FILE):
+            categories = load_categories()
+            remaining = [c for c in categories if c.label != label]
 
-        if len(remaining) == len(categories):
-            raise HTTPException(status_code=404, detail="Category not found")
+            if len(remaining) == len(categories):
+                raise HTTPException(status_code=404, detail="Category not found")
 
-        # Remove label from annotations
-        remove_category_globally(label)
+            # Remove label from annotations
+            remove_category_globally(label)
 
-        # Persist categories
-        save_categories(remaining)
+            # Persist categories
+            save_categories(remaining)
 
-        return {"message": "Category deleted"}
+            return {"message": "Category deleted"}
     except HTTPException:
         raise
     except Exception as e:
@@ -377,7 +450,7 @@ async def get_transcripts():
     try:
         transcript_files = []
         for folder_path in SEGMENTED_DIR.glob("*/"):
-            if folder_path.is_dir():
+            if folder_path.is_dir() and not folder_path.name.startswith("."):
                 transcript_files.append(
                     {
                         "filename": folder_path.name,
@@ -393,8 +466,8 @@ async def get_transcripts():
 
 
 @app.get("/api/transcripts/{filename}")
-async def get_transcript_content(filename: str):
-    """Get content of a specific transcript file"""
+async def get_transcript_content(filename: str, deid: bool = False):
+    """Get content of a specific transcript file, optionally with participant names scrubbed"""
     try:
         file_path = TRANSCRIPTS_DIR / filename
         if not file_path.exists():
@@ -403,6 +476,9 @@ async def get_transcript_content(filename: str):
         with open(file_path, "r", encoding="utf-8") as f:
             content = f.read()
 
+        if deid:
+            content = get_scrubber().scrub_transcript(content)
+
         return {"filename": filename, "content": content, "size": len(content)}
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail="Transcript file not found")
@@ -413,17 +489,20 @@ async def get_transcript_content(filename: str):
 
 
 @app.get("/api/transcripts/{filename}/parsed", response_model=List[TranscriptMessage])
-async def get_parsed_transcript(filename: str):
+async def get_parsed_transcript(filename: str, deid: bool = False):
     """Get parsed transcript content as structured messages"""
     try:
         file_path = TRANSCRIPTS_DIR / filename
         if not file_path.exists():
             raise HTTPException(status_code=404, detail="Transcript file not found")
 
-        with open(file_path, "r", encoding="utf-8") as f:
-            content = f.read()
+        # Parsed once per distinct file content, shared between requests
+        parsed_messages = [m._asdict() for m in parse_cache.get(file_path)]
+
+        if deid:
+            scrubber = get_scrubber()
+            parsed_messages = [scrubber.scrub_message(m) for m in parsed_messages]
 
-        parsed_messages = parse_transcript(content)
         return parsed_messages
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail="Transcript file not found")
@@ -437,50 +516,38 @@ async def get_parsed_transcript(filename: str):
     "/api/transcripts/{transcript_name}/segmented",
     response_model=List[TranscriptSegment],
 )
-async def get_segmented_transcript(transcript_name: str):
+async def get_segmented_transcript(transcript_name: str, deid: bool = False):
     """Get segmented transcript content as an array of segments"""
     try:
         # Remove .txt extension from filename to get the base name
         # base_name = transcript_name.replace(".txt", "")
-        segment_dir = SEGMENTED_DIR / transcript_name
+        entry = index_cache.get_transcript(transcript_name)
 
-        if not segment_dir.exists():
+        if entry is None:
             raise HTTPException(
                 status_code=404, detail="Segmented transcript not found"
             )
 
-        # Find all segment files in the directory
-        segment_files = sorted(segment_dir.glob(f"*.json"))
-
-        if not segment_files:
+        if not entry["segments"]:
             raise HTTPException(status_code=404, detail="No segment files found")
 
         segments = []
-        for segment_file in segment_files:
-            with open(segment_file, "r", encoding="utf-8") as f:
-                segment_data = json.load(f)
-
-                # Convert the messages to TranscriptMessage objects
-                messages = [
-                    TranscriptMessage(
-                        speaker=msg["speaker"],
-                        timestamp=msg["timestamp"],
-                        content=msg["content"].strip(),
-                    )
-                    for msg in segment_data["messages"]
-                ]
-
-                # Create the segment object
-                segment = TranscriptSegment(
-                    start_index=segment_data["start_index"],
-                    end_index=segment_data["end_index"],
-                    title=segment_data["title"],
-                    messages=messages,
-                )
-                segments.append(segment)
+        for segment_data in entry["segments"]:
+            if deid:
+                segment_data = get_scrubber().scrub_segment(segment_data)
+            # Create the segment object
+            segment = TranscriptSegment(
+                start_index=segment_data["start_index"],
+                end_index=segment_data["end_index"],
+                title=segment_data["title"],
+                messages=segment_data["messages"],
+            )
+            segments.append(segment)
 
         return segments
 
+    except HTTPException:
+        raise
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail="Segmented transcript not found")
     except json.JSONDecodeError:
@@ -491,73 +558,97 @@ async def get_segmented_transcript(transcript_name: str):
         )
 
 
-@app.get("/api/transcripts/{transcript_id}/messages", response_model=List[TranscriptMessage])
-async def get_transcript_messages(transcript_id: str, indices: str = ""):
-    """Get transcript messages by transcript id and message indices
+def parse_time_range(start: Optional[str], end: Optional[str]):
+    """Parse the from/to query values into seconds"""
+    try:
+        start_seconds = parse_time(start) if start else None
+        end_seconds = parse_time(end) if end else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if start_seconds is not None and end_seconds is not None and start_seconds > end_seconds:
+        raise HTTPException(status_code=400, detail="from must not be later than to")
+    return start_seconds, end_seconds
+
+
+def resolve_speakers(summary: TimeSummary, speaker: Optional[str], deid: bool) -> Optional[List[str]]:
+    """Speaker keys of a transcript matching the speaker parameter (None matches everyone)"""
+    if speaker is None:
+        return None
+    key = speaker_key(speaker)
+    if not deid:
+        return [key]
+    # De-identified clients only know the pseudonyms
+    scrubber = get_scrubber()
+    return [k for k, name in summary.names.items() if speaker_key(scrubber.scrub_speaker(name)) == key]
+
+
+@app.get("/api/transcripts/{transcript_id}/messages", response_model=List[IndexedTranscriptMessage])
+async def get_transcript_messages(
+    transcript_id: str,
+    indices: str = "",
+    speaker: Optional[str] = None,
+    start: Optional[str] = Query(None, alias="from"),
+    end: Optional[str] = Query(None, alias="to"),
+    deid: bool = False,
+):
+    """Get transcript messages by transcript id and message indices, or by speaker and time range
     
     Args:
         transcript_id: The transcript ID
         indices: Comma-separated message indices (e.g., "0,1,2,5")
+        speaker: Only messages by this speaker (case-insensitive); not combinable with indices
+        from: Only messages at or after this time (hh:mm:ss)
+        to: Only messages at or before this time (hh:mm:ss)
+        deid: Replace participant names with their pseudonyms
     
     Returns:
-        List of TranscriptMessage objects in the order requested
+        List of messages with their global index, in the order requested
+        (transcript order for speaker/time queries)
     """
     try:
-        # Parse the indices from the query parameter
-        if not indices:
-            raise HTTPException(status_code=400, detail="indices parameter is required")
-        
-        try:
-            message_indices = [int(idx.strip()) for idx in indices.split(",")]
-        except ValueError:
-            raise HTTPException(status_code=400, detail="indices must be comma-separated integers")
+        filtered = speaker is not None or bool(start) or bool(end)
+        if not indices and not filtered:
+            raise HTTPException(status_code=400, detail="indices or speaker/from/to parameter is required")
+        if indices and filtered:
+            raise HTTPException(status_code=400, detail="indices cannot be combined with speaker/from/to")
 
-        segment_dir = SEGMENTED_DIR / transcript_id
+        if indices:
+            try:
+                message_indices = [int(idx.strip()) for idx in indices.split(",")]
+            except ValueError:
+                raise HTTPException(status_code=400, detail="indices must be comma-separated integers")
+        else:
+            start_seconds, end_seconds = parse_time_range(start, end)
+
+        entry = index_cache.get_transcript(transcript_id)
 
-        if not segment_dir.exists():
+        if entry is None:
             raise HTTPException(
                 status_code=404, detail="Transcript not found"
             )
 
-        # Find all segment files in the directory
-        segment_files = sorted(segment_dir.glob(f"*.json"))
-
-        if not segment_files:
+        if not entry["segments"]:
             raise HTTPException(status_code=404, detail="No segment files found")
 
-        # Load all messages into a map for quick access
-        messages_map: dict[int, TranscriptMessage] = {}
-        
-        for segment_file in segment_files:
-            with open(segment_file, "r", encoding="utf-8") as f:
-                segment_data = json.load(f)
-                messages = segment_data.get("messages", [])
-                segment_start = segment_data.get("start_index", 0)
-
-                # Map each message by its index
-                for i, msg in enumerate(messages):
-                    message_idx = segment_start + i
-                    messages_map[message_idx] = TranscriptMessage(
-                        speaker=msg["speaker"],
-                        timestamp=msg["timestamp"],
-                        content=msg["content"].strip(),
-                    )
-
-        # Collect messages in the order requested
-        result = []
-        missing_indices = []
-        
-        for idx in message_indices:
-            if idx in messages_map:
-                result.append(messages_map[idx])
-            else:
-                missing_indices.append(idx)
-        
-        # If some indices were missing, include a warning in the response
-        if missing_indices:
-            # Still return the found messages, but log the missing ones
-            # This allows partial results which may be useful
-            pass
+        # All messages keyed by global index, kept up to date by the index cache
+        messages_map = entry["messages"]
+
+        if not indices:
+            # Binary search over the speaker posting lists
+            time_index = entry["time_index"]
+            message_indices = time_index.query(
+                resolve_speakers(time_index.summary, speaker, deid), start_seconds, end_seconds
+            )
+
+        # Collect messages in the order requested; missing indices are skipped
+        # so that partial results are still returned
+        result = [
+            {**messages_map[idx], "index": idx} for idx in message_indices if idx in messages_map
+        ]
+
+        if deid:
+            scrubber = get_scrubber()
+            result = [scrubber.scrub_message(msg) for msg in result]
 
         return result
 
@@ -571,43 +662,88 @@ async def get_transcript_messages(transcript_id: str, indices: str = ""):
         )
 
 
+@app.get("/api/messages")
+async def search_messages(
+    speaker: Optional[str] = None,
+    start: Optional[str] = Query(None, alias="from"),
+    end: Optional[str] = Query(None, alias="to"),
+    transcripts: str = "",
+    limit: int = 1000,
+    deid: bool = False,
+):
+    """Messages by speaker and time range across all segmented transcripts
+
+    Transcripts are first ruled out by the cached speaker time summaries;
+    only the ones that can match are loaded and checked against the disk.
+    """
+    try:
+        start_seconds, end_seconds = parse_time_range(start, end)
+        summaries = index_cache.transcript_summaries()
+        names = sorted(summaries)
+        if transcripts:
+            wanted = {t.strip() for t in transcripts.split(",")}
+            names = [n for n in names if n in wanted]
+
+        results = []
+        match_count = 0
+        for name in names:
+            speakers = resolve_speakers(summaries[name], speaker, deid)
+            if not summaries[name].may_match(speakers, start_seconds, end_seconds):
+                continue
+            try:
+                entry = index_cache.get_transcript(name)
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"Skipping transcript {name} in message search: {e}")
+                continue
+            if entry is None:
+                continue
+            time_index = entry["time_index"]
+            # The summary may predate the entry just validated
+            speakers = resolve_speakers(time_index.summary, speaker, deid)
+            found = time_index.query(speakers, start_seconds, end_seconds)
+            if not found:
+                continue
+            match_count += len(found)
+            remaining = limit - sum(len(r["messages"]) for r in results)
+            if remaining <= 0:
+                continue
+            messages = [{**entry["messages"][idx], "index": idx} for idx in found[:remaining]]
+            if deid:
+                scrubber = get_scrubber()
+                messages = [scrubber.scrub_message(msg) for msg in messages]
+                name = scrubber.scrub_speaker(name)
+            results.append({"transcript": name, "matchCount": len(found), "messages": messages})
+
+        return {
+            "matchCount": match_count,
+            "truncated": match_count > limit,
+            "results": results,
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Error searching messages: {str(e)}"
+        )
+
+
 @app.get("/api/transcripts/{transcript_id}/message/{message_index}", response_model=TranscriptMessage)
-async def get_transcript_message(transcript_id: str, message_index: int):
+async def get_transcript_message(transcript_id: str, message_index: int, deid: bool = False):
     """Get a specific transcript message by transcript id and message index"""
     try:
-        segment_dir = SEGMENTED_DIR / transcript_id
+        entry = index_cache.get_transcript(transcript_id)
 
-        if not segment_dir.exists():
+        if entry is None:
             raise HTTPException(
                 status_code=404, detail="Transcript not found"
             )
 
-        # Find all segment files in the directory
-        segment_files = sorted(segment_dir.glob(f"*.json"))
-
-        if not segment_files:
+        if not entry["segments"]:
             raise HTTPException(status_code=404, detail="No segment files found")
 
-        # Search through all segments to find the message at the given index
-        current_index = 0
-        for segment_file in segment_files:
-            with open(segment_file, "r", encoding="utf-8") as f:
-                segment_data = json.load(f)
-                messages = segment_data.get("messages", [])
-                segment_start = segment_data.get("start_index", current_index)
-                segment_end = segment_data.get("end_index", current_index + len(messages) - 1)
-
-                # Check if the requested index is in this segment
-                if segment_start <= message_index <= segment_end:
-                    # Calculate the position within this segment
-                    position_in_segment = message_index - segment_start
-                    if 0 <= position_in_segment < len(messages):
-                        msg = messages[position_in_segment]
-                        return TranscriptMessage(
-                            speaker=msg["speaker"],
-                            timestamp=msg["timestamp"],
-                            content=msg["content"].strip(),
-                        )
+        if message_index in entry["messages"]:
+            msg = entry["messages"][message_index]
+            return get_scrubber().scrub_message(msg) if deid else msg
 
         raise HTTPException(status_code=404, detail="Message not found at the specified index")
 
@@ -621,15 +757,106 @@ async def get_transcript_message(transcript_id: str, message_index: int):
         )
 
 
+@app.post("/api/ingest", status_code=202)
+def ingest_transcript(
+    file: UploadFile = File(...),
+    name: Optional[str] = Form(None),
+    deid: bool = Form(False),
+    segmenter: str = Form("heuristic"),
+    overwrite: bool = Form(False),
+):
+    """Upload a raw transcript and queue it for parsing and segmentation
+
+    An existing transcript is only replaced with ``overwrite=true``: saved
+    annotations address its messages by index and would no longer line up.
+    """
+    try:
+        transcript_name = (name or Path(file.filename or "").stem).strip()
+        if (
+            not transcript_name
+            or transcript_name.startswith(".")
+            or any(c in transcript_name for c in "/\\")
+        ):
+            raise HTTPException(status_code=400, detail="Invalid transcript name")
+        if segmenter not in SEGMENTERS:
+            raise HTTPException(status_code=400, detail=f"Unknown segmenter: {segmenter}")
+
+        try:
+            content = file.file.read().decode("utf-8")
+        except UnicodeDecodeError:
+            raise HTTPException(status_code=400, detail="Transcript must be UTF-8 text")
+
+        # With deid everything is stored under the pseudonym, and the raw upload
+        # is kept in cache/uploads/ until the job has written the scrubbed copy
+        if deid:
+            transcript_name = get_scrubber().scrub_speaker(transcript_name)
+        check_transcript_name(transcript_name)
+        filename = transcript_name + ".txt"
+        file_path = TRANSCRIPTS_DIR / filename
+        with file_locks.lock(file_path):
+            if not overwrite and (
+                file_path.exists()
+                or (SEGMENTED_DIR / transcript_name).exists()
+                or ingest_queue.pending(transcript_name)
+            ):
+                raise HTTPException(
+                    status_code=409,
+                    detail=f"Transcript {transcript_name} already exists; send overwrite=true to replace it",
+                )
+            upload = None
+            if deid:
+                UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+                upload = UPLOAD_DIR / f"{uuid.uuid4().hex}.txt"
+                atomic_write_text(upload, content)
+            else:
+                atomic_write_text(file_path, content)
+            job = ingest_queue.enqueue(transcript_name, filename, deid, segmenter, upload)
+        ingest_workers.notify()
+
+        return {"message": "Transcript queued for ingestion", "job": job}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Error queueing transcript: {str(e)}"
+        )
+
+
+@app.get("/api/ingest")
+async def list_ingest_jobs(limit: int = 100):
+    """List the most recent ingestion jobs"""
+    try:
+        return ingest_queue.list(limit)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Error reading ingestion jobs: {str(e)}"
+        )
+
+
+@app.get("/api/ingest/{job_id}")
+async def get_ingest_job(job_id: int):
+    """Get the status and progress of an ingestion job"""
+    try:
+        job = ingest_queue.get(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Ingestion job not found")
+        return job
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Error reading ingestion job: {str(e)}"
+        )
+
+
 @app.get("/api/annotations/get/{transcript_name}")
 async def get_annotations(transcript_name: str):
     """Get annotations for a specific transcript"""
+    check_transcript_name(transcript_name)
     try:
-        # Convert transcript filename to annotation filename
-        annotation_filename = transcript_name + ".json"
-        file_path = ANNOTATIONS_DIR / annotation_filename
+        data = index_cache.get_annotations(transcript_name)
 
-        if not file_path.exists():
+        if data is None:
             # Return empty annotations if file doesn't exist
             return {
                 "transcriptFile": transcript_name,
@@ -637,13 +864,7 @@ async def get_annotations(transcript_name: str):
                 "lastModified": None,
             }
 
-        with open(file_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-
-        # Ensure categories field exists on each annotation
-        for ann in data.get("annotations", []):
-            ann.setdefault("categories", [])
-
+        # The index cache fills in missing categories fields when it loads a file
         return data
     except json.JSONDecodeError:
         raise HTTPException(status_code=400, detail="Invalid annotation file format")
@@ -658,18 +879,15 @@ async def get_all_annotations():
     """Get all annotations from all transcript files"""
     try:
         all_annotations = {}
-        annotation_files = sorted([f for f in ANNOTATIONS_DIR.glob("*.json") if f.name != "categories.json"])
-        
-        for annotation_file in annotation_files:
+        # Keyed by the transcript file name (annotation file without .json)
+        for transcript_name in index_cache.annotation_names():
             try:
-                with open(annotation_file, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                    # Use the transcript file name (without .json) as the key
-                    transcript_name = annotation_file.stem
-                    # Ensure categories field exists on each annotation
-                    # for ann in data.get("annotations", []):
-                    #     if "categories" not in ann:
-                    #         ann['categories'] = []
+                data = index_cache.get_annotations(transcript_name)
+                # Ensure categories field exists on each annotation
+                # for ann in data.get("annotations", []):
+                #     if "categories" not in ann:
+                #         ann['categories'] = []
+                if data is not None:
                     all_annotations[transcript_name] = data
             except (json.JSONDecodeError, IOError):
                 # Skip files that can't be read or parsed
@@ -686,8 +904,9 @@ async def get_all_annotations():
 
 
 @app.post("/api/annotations/save/{transcript_name}")
-async def save_annotations(transcript_name: str, annotation_data: AnnotationFile):
+def save_annotations(transcript_name: str, annotation_data: AnnotationFile):
     """Save annotations for a specific transcript"""
+    check_transcript_name(transcript_name)
     try:
         # Convert transcript filename to annotation filename
         annotation_filename = transcript_name + ".json"
@@ -702,8 +921,8 @@ async def save_annotations(transcript_name: str, annotation_data: AnnotationFile
                 ann.categories = []
 
         # Save to file
-        with open(file_path, "w", encoding="utf-8") as f:
-            json.dump(annotation_data.dict(), f, indent=2, ensure_ascii=False)
+        with file_locks.lock(file_path):
+            write_annotation_file(file_path, annotation_data.dict())
 
         return {
             "message": "Annotations saved successfully",
@@ -717,17 +936,22 @@ async def save_annotations(transcript_name: str, annotation_data: AnnotationFile
 
 
 @app.delete("/api/annotations/{transcript_name}")
-async def delete_annotations(transcript_name: str):
+def delete_annotations(transcript_name: str):
     """Delete annotations for a specific transcript"""
+    check_transcript_name(transcript_name)
     try:
         annotation_filename = transcript_name + ".json"
         file_path = ANNOTATIONS_DIR / annotation_filename
 
-        if file_path.exists():
-            file_path.unlink()
-            return {"message": "Annotations deleted successfully"}
-        else:
-            raise HTTPException(status_code=404, detail="Annotation file not found")
+        with file_locks.lock(file_path):
+            if file_path.exists():
+                file_path.unlink()
+                generations.bump("annotations:" + transcript_name)
+                index_cache.discard_annotations(transcript_name)
+                note_annotation_change(transcript_name, None)
+                return {"message": "Annotations deleted successfully"}
+            else:
+                raise HTTPException(status_code=404, detail="Annotation file not found")
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Error deleting annotations: {str(e)}"
@@ -735,40 +959,41 @@ async def delete_annotations(transcript_name: str):
 
 
 @app.put("/api/annotations/{transcript_name}/{annotation_id}")
-async def update_annotation_by_id(transcript_name: str, annotation_id: int, updated_annotation: Annotation):
+def update_annotation_by_id(transcript_name: str, annotation_id: int, updated_annotation: Annotation):
     """Update a specific annotation by ID"""
+    check_transcript_name(transcript_name)
     try:
         annotation_filename = transcript_name + ".json"
         file_path = ANNOTATIONS_DIR / annotation_filename
 
-        if not file_path.exists():
-            raise HTTPException(status_code=404, detail="Annotation file not found")
-
-        # Load existing annotations
-        with open(file_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-
-        # Find and update the annotation with the specified ID
-        annotation_found = False
-        for i, annotation in enumerate(data.get("annotations", [])):
-            if annotation.get("id") == annotation_id:
-                # Replace the entire annotation object but preserve the ID
-                updated_annotation.id = annotation_id
-                if updated_annotation.categories is None:
-                    updated_annotation.categories = []
-                data["annotations"][i] = updated_annotation.dict()
-                annotation_found = True
-                break
-
-        if not annotation_found:
-            raise HTTPException(status_code=404, detail="Annotation not found")
-
-        # Update lastModified timestamp
-        data["lastModified"] = datetime.now().isoformat()
+        with file_locks.lock(file_path):
+            if not file_path.exists():
+                raise HTTPException(status_code=404, detail="Annotation file not found")
+
+            # Load existing annotations
+            with open(file_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+
+            # Find and update the annotation with the specified ID
+            annotation_found = False
+            for i, annotation in enumerate(data.get("annotations", [])):
+                if annotation.get("id") == annotation_id:
+                    # Replace the entire annotation object but preserve the ID
+                    updated_annotation.id = annotation_id
+                    if updated_annotation.categories is None:
+                        updated_annotation.categories = []
+                    data["annotations"][i] = updated_annotation.dict()
+                    annotation_found = True
+                    break
+
+            if not annotation_found:
+                raise HTTPException(status_code=404, detail="Annotation not found")
+
+            # Update lastModified timestamp
+            data["lastModified"] = datetime.now().isoformat()
 
-        # Save updated annotations
-        with open(file_path, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+            # Save updated annotations
+            write_annotation_file(file_path, data)
 
         return {
             "message": "Annotation updated successfully",
@@ -784,36 +1009,37 @@ async def update_annotation_by_id(transcript_name: str, annotation_id: int, upda
 
 
 @app.delete("/api/annotations/{transcript_name}/{annotation_id}")
-async def delete_annotation_by_id(transcript_name: str, annotation_id: int):
+def delete_annotation_by_id(transcript_name: str, annotation_id: int):
     """Delete a specific annotation by ID"""
+    check_transcript_name(transcript_name)
     try:
         annotation_filename = transcript_name + ".json"
         file_path = ANNOTATIONS_DIR / annotation_filename
 
-        if not file_path.exists():
-            raise HTTPException(status_code=404, detail="Annotation file not found")
+        with file_locks.lock(file_path):
+            if not file_path.exists():
+                raise HTTPException(status_code=404, detail="Annotation file not found")
 
-        # Load existing annotations
-        with open(file_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
+            # Load existing annotations
+            with open(file_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
 
-        # Find and remove the annotation with the specified ID
-        original_count = len(data.get("annotations", []))
-        data["annotations"] = [
-            annotation
-            for annotation in data.get("annotations", [])
-            if annotation.get("id") != annotation_id
-        ]
+            # Find and remove the annotation with the specified ID
+            original_count = len(data.get("annotations", []))
+            data["annotations"] = [
+                annotation
+                for annotation in data.get("annotations", [])
+                if annotation.get("id") != annotation_id
+            ]
 
-        if len(data["annotations"]) == original_count:
-            raise HTTPException(status_code=404, detail="Annotation not found")
+            if len(data["annotations"]) == original_count:
+                raise HTTPException(status_code=404, detail="Annotation not found")
 
-        # Update lastModified timestamp
-        data["lastModified"] = datetime.now().isoformat()
+            # Update lastModified timestamp
+            data["lastModified"] = datetime.now().isoformat()
 
-        # Save updated annotations
-        with open(file_path, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+            # Save updated annotations
+            write_annotation_file(file_path, data)
 
         return {
             "message": "Annotation deleted successfully",
@@ -828,6 +1054,80 @@ async def delete_annotation_by_id(transcript_name: str, annotation_id: int):
         )
 
 
+@app.get("/api/annotations/{transcript_name}/{annotation_id}/similar")
+def get_similar_annotations(
+    transcript_name: str, annotation_id: int, k: int = 10, minSimilarity: float = 0.0
+):
+    """Most similar annotations across the corpus and the categories they suggest"""
+    try:
+        # One generation lookup; the annotation files are only rescanned after
+        # another worker wrote some
+        refresh_similarity_index()
+        return similarity_index.similar(
+            (transcript_name, annotation_id), k=max(1, min(k, 100)), min_similarity=minSimilarity
+        )
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Annotation not found")
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Error finding similar annotations: {str(e)}"
+        )
+
+
+def load_agreement_set(source: str) -> Dict[str, dict]:
+    """Annotation files of a directory next to app.py, keyed by transcript"""
+    base_dir = Path.cwd().resolve()
+    directory = Path(source).resolve()
+    if directory.parent != base_dir or not directory.is_dir():
+        raise HTTPException(status_code=404, detail=f"Annotation directory not found: {source}")
+    if directory == ANNOTATIONS_DIR.resolve():
+        # The live annotations are already held by the index cache
+        annotation_set = {}
+        for name in index_cache.annotation_names():
+            data = index_cache.get_annotations(name)
+            if data is not None:
+                annotation_set[name] = data
+        return annotation_set
+    return load_annotation_dir(directory)
+
+
+@app.post("/api/agreement")
+def compute_agreement(request: AgreementRequest):
+    """Inter-annotator agreement (Cohen's/Fleiss' kappa, Krippendorff's alpha) between annotation sets"""
+    try:
+        sets = {}
+        for source in request.sets:
+            if isinstance(source, str):
+                sets[source] = load_agreement_set(source)
+            else:
+                sets[source.name] = source.annotations
+        if len(sets) < 2:
+            raise HTTPException(status_code=400, detail="At least two distinct annotation sets are needed")
+
+        # Messages per transcript, so unannotated messages count as agreement on "no category"
+        message_counts = {}
+        for name in {t for s in sets.values() for t in s}:
+            entry = index_cache.get_transcript(name)
+            if entry is not None and entry["messages"]:
+                message_counts[name] = max(entry["messages"]) + 1
+
+        return agreement_report(
+            sets,
+            message_counts,
+            request.transcripts,
+            request.categories,
+            request.disagreementLimit,
+        )
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Error computing agreement: {str(e)}"
+        )
+
+
 @app.get("/api/health")
 async def health_check():
     """Health check endpoint"""
@@ -837,6 +1137,9 @@ async def health_check():
         "annotations_dir_exists": ANNOTATIONS_DIR.exists(),
         "transcript_files": len(list(TRANSCRIPTS_DIR.glob("*.txt"))),
         "annotation_files": len(list(ANNOTATIONS_DIR.glob("*.json"))),
+        "ready": index_cache.state == "ready",
+        "index": index_cache.status(),
+        "similarity_index": len(similarity_index),
     }
 
 
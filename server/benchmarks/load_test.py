@@ -0,0 +1,194 @@
+"""Load test for the multi-worker production mode (serve.py).
+
+Builds a synthetic corpus in a temporary data directory, starts `serve.py`
+with each requested worker count, hammers it from several client processes
+with a read-heavy mix (segmented transcripts, message lookups, annotation
+reads) plus concurrent annotation updates, and reports requests/second.
+After each run every annotation file is re-read to check that concurrent
+writes did not corrupt it.
+
+    python benchmarks/load_test.py --workers 1 2 4 --duration 10
+"""
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+SERVER_DIR = Path(__file__).resolve().parent.parent
+
+
+def build_corpus(data_dir: Path, transcripts: int, segments: int, messages: int, annotations: int):
+    for t in range(transcripts):
+        name = f"P{t:03d}"
+        segment_dir = data_dir / "segmented" / name
+        segment_dir.mkdir(parents=True)
+        index = 0
+        for s in range(segments):
+            msgs = [
+                {
+                    "speaker": "Interviewer" if i % 2 else name,
+                    "timestamp": f"00:{(index + i) // 60 % 60:02d}:{(index + i) % 60:02d}",
+                    "content": f"Message {index + i} of {name}. " * 8,
+                }
+                for i in range(messages)
+            ]
+            segment = {
+                "start_index": index,
+                "end_index": index + messages - 1,
+                "title": f"Segment {s}",
+                "messages": msgs,
+            }
+            (segment_dir / f"{s}.json").write_text(json.dumps(segment), encoding="utf-8")
+            index += messages
+        (data_dir / "annotations").mkdir(exist_ok=True)
+        annotation_file = {
+            "transcriptFile": name,
+            "lastModified": None,
+            "annotations": [
+                {
+                    "id": a,
+                    "label": f"Annotation {a}",
+                    "description": "",
+                    "messageIndices": [a, a + 1],
+                    "timestamp": "2024-01-01T00:00:00",
+                    "categories": [],
+                }
+                for a in range(annotations)
+            ],
+        }
+        (data_dir / "annotations" / f"{name}.json").write_text(
+            json.dumps(annotation_file), encoding="utf-8"
+        )
+
+
+def request(conn: http.client.HTTPConnection, method: str, path: str, body=None) -> int:
+    headers = {"Content-Type": "application/json"} if body is not None else {}
+    conn.request(method, path, body=json.dumps(body) if body is not None else None, headers=headers)
+    response = conn.getresponse()
+    response.read()
+    return response.status
+
+
+def client(args) -> tuple:
+    port, duration, transcripts, annotations, write_ratio, seed = args
+    rng = random.Random(seed)
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    done = errors = 0
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        name = f"P{rng.randrange(transcripts):03d}"
+        roll = rng.random()
+        if roll < write_ratio:
+            ann_id = rng.randrange(annotations)
+            body = {
+                "id": ann_id,
+                "label": f"Annotation {ann_id} by client {seed}",
+                "description": "updated during load test",
+                "messageIndices": [ann_id, ann_id + 1],
+                "timestamp": "2024-01-01T00:00:00",
+                "categories": [],
+            }
+            status = request(conn, "PUT", f"/api/annotations/{name}/{ann_id}", body)
+        elif roll < 0.5:
+            status = request(conn, "GET", f"/api/transcripts/{name}/segmented")
+        elif roll < 0.8:
+            indices = ",".join(str(rng.randrange(100)) for _ in range(5))
+            status = request(conn, "GET", f"/api/transcripts/{name}/messages?indices={indices}")
+        else:
+            status = request(conn, "GET", f"/api/annotations/get/{name}")
+        done += 1
+        if status != 200:
+            errors += 1
+    conn.close()
+    return done, errors
+
+
+def wait_until_ready(port: int, timeout: float = 60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=2)
+            conn.request("GET", "/api/health")
+            health = json.loads(conn.getresponse().read())
+            conn.close()
+            if health.get("ready"):
+                return
+        except (OSError, ValueError):
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("server did not become ready")
+
+
+def check_integrity(data_dir: Path, annotations: int) -> int:
+    broken = 0
+    for annotation_file in (data_dir / "annotations").glob("P*.json"):
+        try:
+            data = json.loads(annotation_file.read_text(encoding="utf-8"))
+            if len(data["annotations"]) != annotations:
+                broken += 1
+        except (ValueError, KeyError):
+            broken += 1
+    return broken
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--clients", type=int, default=8, help="Concurrent client processes")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds per run")
+    parser.add_argument("--transcripts", type=int, default=20)
+    parser.add_argument("--segments", type=int, default=5)
+    parser.add_argument("--messages", type=int, default=40, help="Messages per segment")
+    parser.add_argument("--annotations", type=int, default=20, help="Annotations per transcript")
+    parser.add_argument("--write-ratio", type=float, default=0.1)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = Path(tmp)
+        build_corpus(data_dir, args.transcripts, args.segments, args.messages, args.annotations)
+
+        cpus = os.cpu_count() or 1
+        print(f"{cpus} CPUs available to server workers and {args.clients} client processes")
+        if cpus < max(args.workers) * 2:
+            print("Workers and clients share the same cores; throughput cannot scale with workers here")
+        print(f"{'workers':>8} {'requests':>10} {'errors':>7} {'req/s':>9} {'corrupt files':>14}")
+        for workers in args.workers:
+            server = subprocess.Popen(
+                [
+                    sys.executable, str(SERVER_DIR / "serve.py"),
+                    "--workers", str(workers),
+                    "--port", str(args.port),
+                    "--host", "127.0.0.1",
+                    "--data-dir", str(data_dir),
+                ],
+            )
+            try:
+                wait_until_ready(args.port)
+                jobs = [
+                    (args.port, args.duration, args.transcripts, args.annotations, args.write_ratio, seed)
+                    for seed in range(args.clients)
+                ]
+                start = time.perf_counter()
+                with multiprocessing.Pool(args.clients) as pool:
+                    results = pool.map(client, jobs)
+                elapsed = time.perf_counter() - start
+            finally:
+                server.terminate()
+                server.wait()
+
+            total = sum(done for done, _ in results)
+            errors = sum(err for _, err in results)
+            corrupt = check_integrity(data_dir, args.annotations)
+            print(f"{workers:>8} {total:>10} {errors:>7} {total / elapsed:>9.0f} {corrupt:>14}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""Throughput of the transcript parser, before and after transcript_parser.py.
+
+Generates a synthetic transcript of the requested size and reports MB/s for
+the previous in-app parser (uncompiled regex per line, whole-file split,
+intermediate dicts, a Pydantic model per message) and for the streaming
+parser reading from a string and from a file handle.
+
+    python benchmarks/parser_benchmark.py --size-mb 50
+"""
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+from pydantic import BaseModel
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from transcript_parser import iter_message_chunks, iter_messages, parse_transcript  # noqa: E402
+
+
+class TranscriptMessage(BaseModel):
+    speaker: str
+    timestamp: str
+    content: str
+
+
+def legacy_parse_transcript(content: str) -> List[TranscriptMessage]:
+    """The parser as it was in app.py"""
+    messages = []
+    lines = content.split("\n")
+    current_message = None
+
+    for line in lines:
+        line = line.strip()
+
+        import re
+
+        speaker_match = re.match(r"^\[([^\]]+)\]\s+(\d{1,2}:\d{2}:\d{2})$", line)
+
+        if speaker_match:
+            if current_message:
+                content_text = "\n".join(current_message["content"]).strip()
+                if content_text:
+                    messages.append(
+                        TranscriptMessage(
+                            speaker=current_message["speaker"],
+                            timestamp=current_message["timestamp"],
+                            content=content_text,
+                        )
+                    )
+            current_message = {
+                "speaker": speaker_match.group(1),
+                "timestamp": speaker_match.group(2),
+                "content": [],
+            }
+        elif current_message and line != "":
+            current_message["content"].append(line)
+        elif current_message and line == "":
+            current_message["content"].append("")
+
+    if current_message:
+        content_text = "\n".join(current_message["content"]).strip()
+        if content_text:
+            messages.append(
+                TranscriptMessage(
+                    speaker=current_message["speaker"],
+                    timestamp=current_message["timestamp"],
+                    content=content_text,
+                )
+            )
+
+    return messages
+
+
+def synthetic_transcript(size_bytes: int) -> str:
+    rng = random.Random(0)
+    words = "so I think the car would probably be a good fit because it feels safe".split()
+    parts = []
+    total = 0
+    seconds = 0
+    while total < size_bytes:
+        seconds += rng.randint(2, 40)
+        speaker = rng.choice(["Interviewer", "Participant"])
+        lines = [" ".join(rng.choices(words, k=rng.randint(5, 30))) for _ in range(rng.randint(1, 3))]
+        block = (
+            f"[{speaker}] {seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}\n"
+            + "\n".join(lines)
+            + "\n\n"
+        )
+        parts.append(block)
+        total += len(block)
+    return "".join(parts)
+
+
+def best_of(runs: int, fn) -> float:
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=float, default=20)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    content = synthetic_transcript(int(args.size_mb * 1024 * 1024))
+    size_mb = len(content.encode("utf-8")) / (1024 * 1024)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "transcript.txt"
+        path.write_text(content, encoding="utf-8")
+
+        def stream_file():
+            with open(path, "r", encoding="utf-8") as f:
+                for _ in iter_messages(f):
+                    pass
+
+        def chunked_file():
+            with open(path, "r", encoding="utf-8") as f:
+                for _ in iter_message_chunks(f, 5000):
+                    pass
+
+        assert [dict(m) for m in legacy_parse_transcript(content)] == [
+            m._asdict() for m in parse_transcript(content)
+        ], "parsers disagree"
+
+        cases = [
+            ("before: app.parse_transcript (str)", lambda: legacy_parse_transcript(content)),
+            ("after: parse_transcript (str)", lambda: parse_transcript(content)),
+            ("after: iter_messages (file)", stream_file),
+            ("after: iter_message_chunks (file)", chunked_file),
+        ]
+        print(f"{size_mb:.1f} MB transcript, best of {args.runs} runs")
+        for name, fn in cases:
+            elapsed = best_of(args.runs, fn)
+            print(f"{name:<38} {size_mb / elapsed:8.1f} MB/s")
+
+
+if __name__ == "__main__":
+    main()
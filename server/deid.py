@@ -0,0 +1,316 @@
+"""De-identification of participant names in transcripts.
+
+`de_id` lists the original participant names followed by their pseudonyms
+(first half -> second half, one name per line). All names are compiled into
+a single matcher: the lower-cased, whitespace-trimmed, accent-folded names
+are merged into a trie, and the trie is emitted as one regular expression in
+which every letter also matches its accented forms ("Zoe" matches "Zoë" and
+"Zoë" listed in de_id matches "Zoe"), so a line is scanned once regardless of
+how many names there are. A match must not touch another letter; digits, underscores and
+punctuation count as separators, which covers possessives such as "Alex's"
+and file names such as "Alex_0.json". Speaker labels (message speakers,
+transcript headers, folder names) that contain a listed name are replaced by
+the pseudonym as a whole, so a surname next to the first name is not kept.
+
+The corpus run writes scrubbed copies of `transcripts/` and `segmented/` to
+`de_id_transcripts/` and `de_id_segmented/` (folder and file names are
+pseudonymised too). Files are scrubbed in a process pool, text files are
+streamed line by line, and a manifest of content hashes lets unchanged files
+be skipped on the next run.
+
+    python deid.py [--workers N] [--force]
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from locking import atomic_write_text
+
+DE_ID_FILE = Path("de_id")
+TRANSCRIPTS_DIR = Path("transcripts")
+SEGMENTED_DIR = Path("segmented")
+DE_ID_TRANSCRIPTS_DIR = Path("de_id_transcripts")
+DE_ID_SEGMENTED_DIR = Path("de_id_segmented")
+MANIFEST_FILE = Path("cache") / "deid_manifest.json"
+
+# Part of every file digest, so outputs are rewritten when the scrubbing rules change
+SCRUB_VERSION = 3
+
+# "[Speaker Name] hh:mm:ss" header lines of raw transcripts (see transcript_parser)
+HEADER_PATTERN = re.compile(r"^(\s*\[)([^\]]+)(\]\s+\d{1,2}:\d{2}:\d{2}\s*)$")
+
+
+def normalize_name(name: str) -> str:
+    return " ".join(name.split()).lower()
+
+
+def strip_accents(name: str) -> str:
+    decomposed = unicodedata.normalize("NFKD", name)
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def fold_name(name: str) -> str:
+    """Key that names are compared by: whitespace-normalised, lower-case, without accents"""
+    name = normalize_name(name)
+    return name if name.isascii() else strip_accents(name)
+
+
+def _accent_variants() -> Dict[str, str]:
+    """Base letter -> its precomposed accented lower-case forms in the Latin blocks"""
+    variants: Dict[str, set] = {}
+    for codepoint in list(range(0xC0, 0x250)) + list(range(0x1E00, 0x1F00)):
+        char = chr(codepoint).lower()
+        base = strip_accents(char)
+        if len(base) == 1 and base != char:
+            variants.setdefault(base, set()).add(char)
+    return {base: "".join(sorted(chars)) for base, chars in variants.items()}
+
+
+ACCENT_VARIANTS = _accent_variants()
+COMBINING_MARKS = "[\u0300-\u036f]*"  # Accents typed as separate combining characters
+
+
+def _char_pattern(char: str) -> str:
+    if char in ACCENT_VARIANTS:
+        return "[" + re.escape(char + ACCENT_VARIANTS[char]) + "]" + COMBINING_MARKS
+    if char.isalpha():
+        return re.escape(char) + COMBINING_MARKS
+    return re.escape(char)
+
+
+def load_name_map(path: Path = DE_ID_FILE) -> Dict[str, str]:
+    """Read the de_id list into {original name: pseudonym}"""
+    names = [line.strip() for line in path.read_text(encoding="utf-8").splitlines()]
+    names = [n for n in names if n]
+    if len(names) % 2:
+        raise ValueError(f"{path} must list as many pseudonyms as original names")
+    half = len(names) // 2
+    return dict(zip(names[:half], names[half:]))
+
+
+def _trie_pattern(words: Iterable[str], char_pattern: Callable[[str], str] = _char_pattern) -> str:
+    trie: dict = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = True
+
+    def emit(node: dict) -> str:
+        terminal = "" in node
+        branches = [char_pattern(c) + emit(child) for c, child in sorted(node.items()) if c]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if terminal:
+            # Greedy optional keeps the longest name, the boundary check backtracks
+            return "(?:" + body + ")?"
+        return body
+
+    return emit(trie)
+
+
+class Scrubber:
+    """Replaces every listed participant name with its stable pseudonym"""
+
+    def __init__(self, name_map: Dict[str, str]):
+        self.name_map = name_map
+        self.replacements: Dict[str, str] = {}
+        # Keyed by folded name; matches are folded the same way to find their pseudonym
+        for original, pseudonym in name_map.items():
+            self.replacements.setdefault(fold_name(original), pseudonym)
+        # Only letters extend a word: "Alex_0" and "Jacob2" still contain a name.
+        # Whitespace inside a multi-word name may vary in the transcript.
+        def compile_names(char_pattern: Callable[[str], str]) -> "re.Pattern":
+            alternation = _trie_pattern(self.replacements, char_pattern).replace(r"\ ", r"\s+")
+            return re.compile(r"(?<![^\W\d_])" + alternation + r"(?![^\W\d_])", re.IGNORECASE)
+
+        self.pattern = compile_names(_char_pattern)
+        # Plain-ASCII text (most of a transcript) cannot contain accents, so the
+        # simpler pattern without accent classes is enough and about twice as fast
+        self.ascii_pattern = compile_names(re.escape)
+        self.fingerprint = hashlib.sha256(
+            json.dumps([SCRUB_VERSION, sorted(name_map.items())]).encode("utf-8")
+        ).hexdigest()
+
+    def _replace(self, match: "re.Match") -> str:
+        found = match.group(0)
+        pseudonym = self.replacements.get(fold_name(found))
+        if pseudonym is None:
+            return found
+        if found.isupper() and len(found) > 1:
+            return pseudonym.upper()
+        if found.islower():
+            return pseudonym.lower()
+        return pseudonym
+
+    def _pattern_for(self, text: str) -> "re.Pattern":
+        return self.ascii_pattern if text.isascii() else self.pattern
+
+    def scrub(self, text: str) -> str:
+        if not self.replacements:
+            return text
+        return self._pattern_for(text).sub(self._replace, text)
+
+    def scrub_speaker(self, label: str) -> str:
+        """Replace a whole speaker label (or transcript name) that contains a listed name"""
+        if not self.replacements:
+            return label
+        for match in self._pattern_for(label).finditer(label):
+            pseudonym = self.replacements.get(fold_name(match.group(0)))
+            if pseudonym is not None:
+                return pseudonym
+        return label
+
+    def scrub_line(self, line: str) -> str:
+        """Scrub one raw transcript line, replacing the whole speaker label of header lines"""
+        header = HEADER_PATTERN.match(line)
+        if header is not None:
+            return header.group(1) + self.scrub_speaker(header.group(2)) + header.group(3)
+        return self.scrub(line)
+
+    def scrub_transcript(self, content: str) -> str:
+        return "".join(self.scrub_line(line) for line in content.splitlines(keepends=True))
+
+    def scrub_message(self, message: dict) -> dict:
+        """Return a scrubbed copy of a {speaker, timestamp, content} message"""
+        scrubbed = dict(message)
+        scrubbed["speaker"] = self.scrub_speaker(message["speaker"])
+        scrubbed["content"] = self.scrub(message["content"])
+        return scrubbed
+
+    def scrub_segment(self, segment: dict) -> dict:
+        scrubbed = dict(segment)
+        scrubbed["title"] = self.scrub(segment.get("title", ""))
+        scrubbed["messages"] = [self.scrub_message(m) for m in segment.get("messages", [])]
+        return scrubbed
+
+
+def file_digest(path: Path, fingerprint: str) -> str:
+    """Hash a file in chunks together with the name-map fingerprint"""
+    digest = hashlib.sha256(fingerprint.encode("utf-8"))
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# ----- corpus run (process pool) -----
+
+_worker_scrubber: Optional[Scrubber] = None
+
+
+def _init_worker(name_map: Dict[str, str]) -> None:
+    global _worker_scrubber
+    _worker_scrubber = Scrubber(name_map)
+
+
+def scrub_transcript_file(scrubber: Scrubber, src: Path, dst: Path) -> None:
+    """Stream a raw transcript through the scrubber, one line at a time"""
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dst.with_name(f".{dst.name}.{os.getpid()}.tmp")
+    with open(src, "r", encoding="utf-8") as fin, open(tmp, "w", encoding="utf-8") as fout:
+        for line in fin:
+            fout.write(scrubber.scrub_line(line))
+    os.replace(tmp, dst)
+
+
+def scrub_segment_file(scrubber: Scrubber, src: Path, dst: Path) -> None:
+    with open(src, "r", encoding="utf-8") as f:
+        segment = json.load(f)
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    atomic_write_text(dst, json.dumps(scrubber.scrub_segment(segment), indent=4, ensure_ascii=False))
+
+
+def _scrub_task(task: Tuple[str, str, str]) -> str:
+    kind, src, dst = task
+    if kind == "transcript":
+        scrub_transcript_file(_worker_scrubber, Path(src), Path(dst))
+    else:
+        scrub_segment_file(_worker_scrubber, Path(src), Path(dst))
+    return src
+
+
+def plan_corpus(scrubber: Scrubber) -> List[Tuple[str, Path, Path]]:
+    """List (kind, source, destination) for every transcript and segment file"""
+    tasks = []
+    for src in sorted(TRANSCRIPTS_DIR.rglob("*.txt")):
+        rel = src.relative_to(TRANSCRIPTS_DIR)
+        dst = DE_ID_TRANSCRIPTS_DIR / rel.parent / (scrubber.scrub_speaker(rel.stem) + rel.suffix)
+        tasks.append(("transcript", src, dst))
+    for segment_dir in sorted(p for p in SEGMENTED_DIR.glob("*/") if p.is_dir() and not p.name.startswith(".")):
+        for src in sorted(segment_dir.glob("*.json")):
+            dst = DE_ID_SEGMENTED_DIR / scrubber.scrub_speaker(segment_dir.name) / scrubber.scrub(src.name)
+            tasks.append(("segment", src, dst))
+    return tasks
+
+
+def remove_stale_outputs(keep: Iterable[Path]) -> int:
+    """Delete output files no longer produced by the plan (e.g. written under an older naming)"""
+    keep = {Path(p).resolve() for p in keep}
+    removed = 0
+    for output_dir in (DE_ID_TRANSCRIPTS_DIR, DE_ID_SEGMENTED_DIR):
+        if not output_dir.is_dir():
+            continue
+        for path in sorted(output_dir.rglob("*"), reverse=True):
+            if path.is_file() and path.resolve() not in keep:
+                path.unlink()
+                removed += 1
+            elif path.is_dir() and not any(path.iterdir()):
+                path.rmdir()
+    return removed
+
+
+def deidentify_corpus(workers: Optional[int] = None, force: bool = False) -> dict:
+    """Scrub every changed transcript and segment file; returns counts"""
+    name_map = load_name_map()
+    scrubber = Scrubber(name_map)
+
+    try:
+        manifest = json.loads(MANIFEST_FILE.read_text(encoding="utf-8"))
+    except (FileNotFoundError, json.JSONDecodeError):
+        manifest = {}
+
+    todo = []
+    digests = {}
+    plan = plan_corpus(scrubber)
+    for kind, src, dst in plan:
+        digest = file_digest(src, scrubber.fingerprint)
+        digests[str(src)] = digest
+        if not force and manifest.get(str(src)) == digest and dst.exists():
+            continue
+        todo.append((kind, str(src), str(dst)))
+
+    if todo:
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker, initargs=(name_map,)
+        ) as pool:
+            for src in pool.map(_scrub_task, todo, chunksize=8):
+                manifest[src] = digests[src]
+    removed = remove_stale_outputs(dst for _, _, dst in plan)
+
+    MANIFEST_FILE.parent.mkdir(parents=True, exist_ok=True)
+    atomic_write_text(MANIFEST_FILE, json.dumps(manifest, indent=2))
+    return {"scrubbed": len(todo), "skipped": len(digests) - len(todo), "removed": removed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="De-identify transcripts and segmented transcripts")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--force", action="store_true", help="Rewrite files even if unchanged")
+    args = parser.parse_args()
+    result = deidentify_corpus(workers=args.workers, force=args.force)
+    print(
+        f"Scrubbed {result['scrubbed']} files, skipped {result['skipped']} unchanged files, "
+        f"removed {result['removed']} stale files"
+    )
+
+
+if __name__ == "__main__":
+    main()
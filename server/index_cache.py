@@ -0,0 +1,360 @@
+"""In-memory transcript and annotation indexes with an on-disk warm-start snapshot.
+
+The API reads segmented transcripts and annotation files on almost every
+request. This module keeps them in memory, keyed by a cheap file signature
+(mtime + size) and, when several workers share the data directory, a write
+generation from ``locking.GenerationCounter``. A request only has to ``stat``
+the files instead of parsing the JSON again. On shutdown the indexes are
+written to a snapshot file; on startup the snapshot is loaded back, entries
+whose signature still matches the disk are served immediately, and only the
+stale ones are rebuilt in the background.
+
+Every transcript entry also carries a ``TimeSummary`` of its speaker time
+spans, which is stored in the snapshot too. Corpus-wide searches filter on
+the summaries and only load the transcripts that can match. Snapshot entries
+build their message map and time index on first use.
+"""
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from locking import GenerationCounter
+from time_index import TimeSummary, TranscriptTimeIndex
+
+SNAPSHOT_VERSION = 3
+
+
+def file_signature(path: Path) -> Optional[List[int]]:
+    """Return [mtime_ns, size] for a file, or None if it does not exist"""
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def segment_signature(segment_dir: Path) -> Optional[List[list]]:
+    """Return the signature of every segment file in a segmented transcript folder"""
+    if not segment_dir.is_dir():
+        return None
+    signature = []
+    for segment_file in sorted(segment_dir.glob("*.json")):
+        stat = segment_file.stat()
+        signature.append([segment_file.name, stat.st_mtime_ns, stat.st_size])
+    return signature
+
+
+def load_segments(segment_dir: Path) -> List[dict]:
+    """Read all segment files of a transcript, in file name order"""
+    segments = []
+    for segment_file in sorted(segment_dir.glob("*.json")):
+        with open(segment_file, "r", encoding="utf-8") as f:
+            segment_data = json.load(f)
+        for msg in segment_data.get("messages", []):
+            msg["content"] = msg["content"].strip()
+        segments.append(segment_data)
+    return segments
+
+
+def build_message_map(segments: List[dict]) -> Dict[int, dict]:
+    """Map global message index -> message across all segments"""
+    messages_map = {}
+    for segment_data in segments:
+        segment_start = segment_data.get("start_index", 0)
+        for i, msg in enumerate(segment_data.get("messages", [])):
+            messages_map[segment_start + i] = msg
+    return messages_map
+
+
+class IndexCache:
+    """Signature-validated cache of segmented transcripts and annotation files.
+
+    Cached objects are shared between requests and must be treated as
+    read-only by callers; writers go through ``put_annotations``.
+    """
+
+    def __init__(
+        self,
+        segmented_dir: Path,
+        annotations_dir: Path,
+        snapshot_file: Path,
+        generations: Optional[GenerationCounter] = None,
+    ):
+        self.segmented_dir = segmented_dir
+        self.annotations_dir = annotations_dir
+        self.snapshot_file = snapshot_file
+        self.generations = generations
+        self.transcripts: Dict[str, dict] = {}
+        self.annotations: Dict[str, dict] = {}
+        # Corpus state the transcript summaries were last validated against
+        self._summaries_token: Optional[list] = None
+        self.state = "cold"
+        self.pending = 0
+        self._lock = threading.RLock()
+
+    def generation(self, key: str) -> int:
+        return self.generations.get(key) if self.generations is not None else 0
+
+    def _is_fresh(
+        self,
+        entry: Optional[dict],
+        signature: Optional[list],
+        key: Optional[str] = None,
+        generation: Optional[int] = None,
+    ) -> bool:
+        if entry is None or signature is None or entry["signature"] != signature:
+            return False
+        if generation is None:
+            generation = self.generation(key)
+        return entry.get("generation") == generation
+
+    # ----- transcripts -----
+
+    def get_transcript(self, name: str) -> Optional[dict]:
+        """Return {"signature", "segments", "messages", "time_index"} for a transcript, or None if missing"""
+        segment_dir = self.segmented_dir / name
+        signature = segment_signature(segment_dir)
+        if signature is None:
+            with self._lock:
+                self.transcripts.pop(name, None)
+            return None
+
+        generation = self.generation("transcript:" + name)
+        entry = self.transcripts.get(name)
+        if self._is_fresh(entry, signature, generation=generation):
+            if "time_index" in entry:
+                return entry
+            # Loaded from the snapshot with its summary only
+            segments = entry["segments"]
+        else:
+            segments = load_segments(segment_dir)
+
+        entry = self._make_transcript_entry(signature, generation, segments)
+        with self._lock:
+            self.transcripts[name] = entry
+        return entry
+
+    def _make_transcript_entry(self, signature: list, generation: int, segments: List[dict]) -> dict:
+        messages = build_message_map(segments)
+        time_index = TranscriptTimeIndex(messages)
+        return {
+            "signature": signature,
+            "generation": generation,
+            "segments": segments,
+            "messages": messages,
+            "time_index": time_index,
+            "summary": time_index.summary,
+        }
+
+    def transcript_names(self) -> List[str]:
+        return sorted(p.name for p in self.segmented_dir.iterdir() if p.is_dir() and not p.name.startswith("."))
+
+    def transcript_summaries(self) -> Dict[str, TimeSummary]:
+        """Speaker time summary of every segmented transcript, for filtering corpus-wide queries
+
+        The summaries are re-validated against the segment files only when the
+        segmented/ folder (a transcript was added, replaced or removed) or the
+        corpus-wide "transcripts" generation changed. Editing a segment file in
+        place is not noticed here until one of those changes; callers still
+        load and validate every transcript the summaries let through.
+        """
+        token = [file_signature(self.segmented_dir), self.generation("transcripts")]
+        with self._lock:
+            if token == self._summaries_token:
+                return {name: entry["summary"] for name, entry in self.transcripts.items()}
+
+        names = set(self.transcript_names())
+        for name in names:
+            try:
+                entry = self.transcripts.get(name)
+                if not self._is_fresh(
+                    entry, segment_signature(self.segmented_dir / name), "transcript:" + name
+                ):
+                    self.get_transcript(name)
+            except (OSError, ValueError) as e:
+                print(f"Skipping transcript {name} while summarising: {e}")
+                with self._lock:
+                    self.transcripts.pop(name, None)
+        with self._lock:
+            for name in [n for n in self.transcripts if n not in names]:
+                del self.transcripts[name]
+            self._summaries_token = token
+            return {name: entry["summary"] for name, entry in self.transcripts.items()}
+
+    # ----- annotations -----
+
+    def get_annotations(self, name: str) -> Optional[dict]:
+        """Return the parsed annotation file for a transcript, or None if missing"""
+        file_path = self.annotations_dir / (name + ".json")
+        signature = file_signature(file_path)
+        if signature is None:
+            with self._lock:
+                self.annotations.pop(name, None)
+            return None
+
+        generation = self.generation("annotations:" + name)
+        entry = self.annotations.get(name)
+        if self._is_fresh(entry, signature, generation=generation):
+            return entry["data"]
+
+        with open(file_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        # Normalise once here; the cached object is shared and never modified afterwards
+        for ann in data.get("annotations", []):
+            ann.setdefault("categories", [])
+        with self._lock:
+            self.annotations[name] = {
+                "signature": signature,
+                "generation": generation,
+                "data": data,
+            }
+        return data
+
+    def annotation_names(self) -> List[str]:
+        return sorted(
+            f.stem
+            for f in self.annotations_dir.glob("*.json")
+            if f.name != "categories.json"
+        )
+
+    def put_annotations(self, name: str, data: dict) -> None:
+        """Record data that was just written (and its generation bumped) to an annotation file"""
+        signature = file_signature(self.annotations_dir / (name + ".json"))
+        generation = self.generation("annotations:" + name)
+        with self._lock:
+            if signature is None:
+                self.annotations.pop(name, None)
+            else:
+                self.annotations[name] = {
+                    "signature": signature,
+                    "generation": generation,
+                    "data": data,
+                }
+
+    def discard_annotations(self, name: str) -> None:
+        with self._lock:
+            self.annotations.pop(name, None)
+
+    # ----- snapshot -----
+
+    def load_snapshot(self) -> None:
+        """Load the on-disk snapshot, keeping only entries that are still fresh"""
+        self.state = "loading"
+        try:
+            with open(self.snapshot_file, "r", encoding="utf-8") as f:
+                snapshot = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+        if snapshot.get("version") != SNAPSHOT_VERSION:
+            return
+
+        transcripts = {}
+        for name, entry in snapshot.get("transcripts", {}).items():
+            if self._is_fresh(
+                entry, segment_signature(self.segmented_dir / name), "transcript:" + name
+            ):
+                transcripts[name] = {
+                    "signature": entry["signature"],
+                    "generation": entry["generation"],
+                    "segments": entry["segments"],
+                    "summary": TimeSummary.from_json(entry["summary"]),
+                }
+
+        annotations = {}
+        for name, entry in snapshot.get("annotations", {}).items():
+            if self._is_fresh(
+                entry, file_signature(self.annotations_dir / (name + ".json")), "annotations:" + name
+            ):
+                for ann in entry["data"].get("annotations", []):
+                    ann.setdefault("categories", [])
+                annotations[name] = entry
+
+        with self._lock:
+            self.transcripts.update(transcripts)
+            self.annotations.update(annotations)
+
+    def save_snapshot(self) -> None:
+        """Atomically write the current indexes to the snapshot file"""
+        with self._lock:
+            snapshot = {
+                "version": SNAPSHOT_VERSION,
+                "transcripts": {
+                    name: {
+                        "signature": e["signature"],
+                        "generation": e["generation"],
+                        "segments": e["segments"],
+                        "summary": e["summary"].to_json(),
+                    }
+                    for name, e in self.transcripts.items()
+                },
+                "annotations": dict(self.annotations),
+            }
+        self.snapshot_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.snapshot_file.with_name(
+            f"{self.snapshot_file.name}.{os.getpid()}.tmp"
+        )
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(snapshot, f, ensure_ascii=False)
+        os.replace(tmp_path, self.snapshot_file)
+
+    def warm(self) -> None:
+        """Rebuild every stale or missing entry, then persist a fresh snapshot"""
+        self.state = "warming"
+        try:
+            self._warm()
+        except Exception as e:
+            print(f"Warming the index cache stopped early: {e}")
+        finally:
+            # Entries that were not warmed are still loaded on demand
+            self.pending = 0
+            self.state = "ready"
+
+    def _warm(self) -> None:
+        transcript_names = self.transcript_names()
+        annotation_names = self.annotation_names()
+        stale_transcripts = [
+            n for n in transcript_names
+            if not self._is_fresh(
+                self.transcripts.get(n),
+                segment_signature(self.segmented_dir / n),
+                "transcript:" + n,
+            )
+        ]
+        stale_annotations = [
+            n for n in annotation_names
+            if not self._is_fresh(
+                self.annotations.get(n),
+                file_signature(self.annotations_dir / (n + ".json")),
+                "annotations:" + n,
+            )
+        ]
+        self.pending = len(stale_transcripts) + len(stale_annotations)
+
+        for name in stale_transcripts:
+            try:
+                self.get_transcript(name)
+            except Exception as e:
+                print(f"Skipping transcript {name} while warming cache: {e}")
+            self.pending -= 1
+        for name in stale_annotations:
+            try:
+                self.get_annotations(name)
+            except Exception as e:
+                print(f"Skipping annotations {name} while warming cache: {e}")
+            self.pending -= 1
+
+        if stale_transcripts or stale_annotations:
+            try:
+                self.save_snapshot()
+            except (OSError, RuntimeError, TypeError, ValueError) as e:
+                print(f"Could not write index snapshot: {e}")
+
+    def status(self) -> dict:
+        return {
+            "state": self.state,
+            "pending": self.pending,
+            "transcripts": len(self.transcripts),
+            "annotations": len(self.annotations),
+        }
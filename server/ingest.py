@@ -0,0 +1,304 @@
+"""Background ingestion of uploaded raw transcripts.
+
+Uploads are stored in `transcripts/` (or, when they are to be de-identified,
+privately under `cache/uploads/` until the job has written the scrubbed
+copy to `transcripts/`) and recorded as jobs in a SQLite queue
+(`cache/jobs.db`), so queued work survives restarts and is shared by every
+API worker process. A dispatcher thread claims jobs and runs them in a small
+process pool (parsing, de-identification and segmentation are CPU bound and
+must not hold the API's GIL). Each job parses the transcript, optionally
+scrubs participant names, segments it and atomically replaces
+`segmented/<name>/` (staged under `cache/staging/` and serialised per name
+with a file lock), reporting its stage and progress back to the queue.
+"""
+import json
+import multiprocessing
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+
+from deid import Scrubber, load_name_map, scrub_transcript_file
+from locking import FileLocks, GenerationCounter, atomic_write_text
+from segmenters import get_segmenter, validate_segments
+from transcript_parser import iter_messages
+
+TRANSCRIPTS_DIR = Path("transcripts")
+SEGMENTED_DIR = Path("segmented")
+DE_ID_FILE = Path("de_id")
+JOBS_DB = Path("cache") / "jobs.db"
+GENERATIONS_DB = Path("cache") / "state.db"
+# Same filesystem as segmented/ so the final swap is a rename, but outside it
+# so half-written folders are never listed as transcripts
+STAGING_DIR = Path("cache") / "staging"
+LOCK_DIR = Path("cache") / "locks"
+# Raw uploads that still contain real names; removed once their job finishes
+UPLOAD_DIR = Path("cache") / "uploads"
+
+# A running job that has not reported progress for this long is assumed to
+# belong to a worker that died and is put back on the queue
+JOB_LEASE_SECONDS = 15 * 60
+
+JOB_COLUMNS = (
+    "id", "transcript", "filename", "deid", "segmenter", "status", "stage",
+    "progress", "message_count", "segment_count", "output", "error",
+    "created", "updated",
+)
+
+
+class JobQueue:
+    """Persistent FIFO of ingestion jobs stored in SQLite"""
+
+    def __init__(self, db_path: Path = JOBS_DB):
+        self.db_path = db_path
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    transcript TEXT NOT NULL,
+                    filename TEXT NOT NULL,
+                    deid INTEGER NOT NULL DEFAULT 0,
+                    segmenter TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    stage TEXT,
+                    progress REAL NOT NULL DEFAULT 0,
+                    message_count INTEGER,
+                    segment_count INTEGER,
+                    output TEXT,
+                    error TEXT,
+                    created TEXT NOT NULL,
+                    updated TEXT NOT NULL,
+                    heartbeat REAL,
+                    upload TEXT
+                )"""
+            )
+            # Queues created before raw uploads were kept out of transcripts/
+            if "upload" not in {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}:
+                conn.execute("ALTER TABLE jobs ADD COLUMN upload TEXT")
+            self._local.conn = conn
+        return conn
+
+    def _row(self, row) -> Optional[dict]:
+        if row is None:
+            return None
+        job = dict(zip(JOB_COLUMNS, row))
+        job["deid"] = bool(job["deid"])
+        return job
+
+    def enqueue(
+        self, transcript: str, filename: str, deid: bool, segmenter: str, upload: Optional[Path] = None
+    ) -> dict:
+        now = datetime.now().isoformat()
+        cursor = self._connection().execute(
+            "INSERT INTO jobs (transcript, filename, deid, segmenter, status, stage, created, updated, upload) "
+            "VALUES (?, ?, ?, ?, 'queued', 'queued', ?, ?, ?)",
+            (transcript, filename, int(deid), segmenter, now, now, None if upload is None else str(upload)),
+        )
+        return self.get(cursor.lastrowid)
+
+    def pending(self, transcript: str) -> bool:
+        """Whether a queued or running job will write ``transcript``"""
+        row = self._connection().execute(
+            "SELECT 1 FROM jobs WHERE transcript = ? AND status IN ('queued', 'running') LIMIT 1",
+            (transcript,),
+        ).fetchone()
+        return row is not None
+
+    def upload(self, job_id: int) -> Optional[Path]:
+        """Private raw upload of a de-identification job, if any"""
+        row = self._connection().execute("SELECT upload FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return Path(row[0]) if row and row[0] else None
+
+    def get(self, job_id: int) -> Optional[dict]:
+        row = self._connection().execute(
+            f"SELECT {', '.join(JOB_COLUMNS)} FROM jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+        return self._row(row)
+
+    def list(self, limit: int = 100) -> List[dict]:
+        rows = self._connection().execute(
+            f"SELECT {', '.join(JOB_COLUMNS)} FROM jobs ORDER BY id DESC LIMIT ?", (limit,)
+        ).fetchall()
+        return [self._row(r) for r in rows]
+
+    def claim(self) -> Optional[dict]:
+        """Atomically take the oldest queued (or abandoned) job and mark it running"""
+        conn = self._connection()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT id FROM jobs WHERE status = 'queued' "
+                "OR (status = 'running' AND heartbeat < ?) ORDER BY id LIMIT 1",
+                (now - JOB_LEASE_SECONDS,),
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'running', stage = 'starting', progress = 0, "
+                "error = NULL, heartbeat = ?, updated = ? WHERE id = ?",
+                (now, datetime.now().isoformat(), row[0]),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return self.get(row[0])
+
+    def update(self, job_id: int, **fields) -> None:
+        fields["updated"] = datetime.now().isoformat()
+        fields["heartbeat"] = time.time()
+        assignments = ", ".join(f"{k} = ?" for k in fields)
+        self._connection().execute(
+            f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id)
+        )
+
+
+def write_segmented(name: str, segments: List[dict]) -> Path:
+    """Write segment files to a staging folder, then swap it into segmented/"""
+    target = SEGMENTED_DIR / name
+    staging = STAGING_DIR / f"{name}.{os.getpid()}.staging"
+    shutil.rmtree(staging, ignore_errors=True)
+    staging.mkdir(parents=True)
+    for index, segment in enumerate(segments):
+        atomic_write_text(staging / f"{index}.json", json.dumps(segment, indent=4, ensure_ascii=False))
+
+    SEGMENTED_DIR.mkdir(exist_ok=True)
+    # Jobs for the same name in other processes must not interleave the swap
+    with FileLocks(LOCK_DIR).lock(target):
+        previous = None
+        if target.exists():
+            previous = STAGING_DIR / f"{name}.{os.getpid()}.previous"
+            shutil.rmtree(previous, ignore_errors=True)
+            os.replace(target, previous)
+        os.replace(staging, target)
+    if previous is not None:
+        shutil.rmtree(previous, ignore_errors=True)
+    return target
+
+
+def run_job(job: dict) -> None:
+    """Parse, optionally de-identify, segment and store one uploaded transcript"""
+    queue = JobQueue()
+    job_id = job["id"]
+    upload = queue.upload(job_id)
+    try:
+        if upload is not None:
+            # Only the scrubbed copy ever reaches transcripts/; the job name is already the pseudonym
+            queue.update(job_id, stage="de-identifying", progress=0.1)
+            scrub_transcript_file(Scrubber(load_name_map(DE_ID_FILE)), upload, TRANSCRIPTS_DIR / job["filename"])
+
+        queue.update(job_id, stage="parsing", progress=0.3)
+        with open(TRANSCRIPTS_DIR / job["filename"], "r", encoding="utf-8") as f:
+            messages = [m._asdict() for m in iter_messages(f)]
+        if not messages:
+            raise ValueError("No messages found; expected lines like '[Speaker] hh:mm:ss'")
+
+        name = job["transcript"]
+        if job["deid"] and upload is None:
+            # Queued before raw uploads were kept under cache/uploads/: scrub in memory
+            scrubber = Scrubber(load_name_map(DE_ID_FILE))
+            messages = [scrubber.scrub_message(m) for m in messages]
+            name = scrubber.scrub_speaker(name)
+
+        queue.update(job_id, stage="segmenting", progress=0.5, message_count=len(messages))
+        segmenter = get_segmenter(job["segmenter"])
+        segments = validate_segments(segmenter.segment(messages), len(messages))
+        for segment in segments:
+            segment["messages"] = messages[segment["start_index"]:segment["end_index"] + 1]
+
+        queue.update(job_id, stage="writing", progress=0.9, segment_count=len(segments))
+        write_segmented(name, segments)
+        generations = GenerationCounter(GENERATIONS_DB)
+        generations.bump("transcript:" + name)
+        generations.bump("transcripts")
+
+        queue.update(job_id, status="done", stage="done", progress=1.0, output=name)
+    except Exception as e:
+        queue.update(job_id, status="failed", stage="failed", error=f"{type(e).__name__}: {e}")
+    finally:
+        if upload is not None:
+            upload.unlink(missing_ok=True)
+
+
+class IngestWorkers:
+    """Feeds queued jobs to a process pool without blocking the event loop"""
+
+    def __init__(self, queue: JobQueue, concurrency: int = 2):
+        self.queue = queue
+        self.concurrency = concurrency
+        self._slots = threading.Semaphore(concurrency)
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def _new_pool(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=self.concurrency, mp_context=multiprocessing.get_context("spawn")
+        )
+
+    def start(self) -> None:
+        self._pool = self._new_pool()
+        self._thread = threading.Thread(target=self._dispatch, name="ingest-dispatch", daemon=True)
+        self._thread.start()
+
+    def notify(self) -> None:
+        """Wake the dispatcher after a new upload instead of waiting for the next poll"""
+        self._wake.set()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def _dispatch(self) -> None:
+        while not self._stop.is_set():
+            if not self._slots.acquire(timeout=1.0):
+                continue
+            try:
+                job = self.queue.claim()
+            except sqlite3.Error as e:
+                print(f"Could not claim ingestion job: {e}")
+                job = None
+            if job is None:
+                self._slots.release()
+                self._wake.wait(timeout=1.0)
+                self._wake.clear()
+                continue
+            try:
+                future = self._pool.submit(run_job, job)
+            except BrokenProcessPool:
+                # A worker process died earlier; replace the pool and carry on
+                self._pool = self._new_pool()
+                future = self._pool.submit(run_job, job)
+            future.add_done_callback(lambda f, job_id=job["id"]: self._finished(job_id, f))
+
+    def _finished(self, job_id: int, future) -> None:
+        self._slots.release()
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is not None:
+            # The worker process died before the job could record the failure itself
+            self.queue.update(job_id, status="failed", stage="failed", error=f"{type(error).__name__}: {error}")
+            upload = self.queue.upload(job_id)
+            if upload is not None:
+                upload.unlink(missing_ok=True)
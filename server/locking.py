@@ -0,0 +1,156 @@
+"""Cross-process coordination for running the API with several workers.
+
+Every worker process keeps its own in-memory indexes, while all of them share
+the JSON files on disk. Two things keep that safe:
+
+- ``FileLocks`` serialises read-modify-write cycles on a data file between
+  processes (``fcntl.flock`` on POSIX, ``msvcrt.locking`` on Windows), and
+  ``atomic_write_text`` makes sure readers never see a half-written file.
+- ``GenerationCounter`` is a tiny SQLite table of per-key counters. Writers bump
+  the counter of what they changed, and every worker compares it with the
+  generation its cached copy was built from, so a write in one worker
+  invalidates the caches of all the others even when mtime/size do not change.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class _HeldLock:
+    """Thread exclusion plus the flock of one lock file, re-entrant per thread"""
+
+    def __init__(self):
+        self.thread_lock = threading.RLock()
+        self.depth = 0
+        self.file = None
+
+
+# Shared by every FileLocks instance of the process: flock conflicts between
+# two open file descriptions even inside one process, so there must be exactly
+# one holder per lock file
+_held: Dict[str, _HeldLock] = {}
+_held_guard = threading.Lock()
+
+
+class FileLocks:
+    """Exclusive inter-process locks, one lock file per protected data file"""
+
+    def __init__(self, lock_dir: Path):
+        self.lock_dir = lock_dir
+
+    def lock_file(self, path: Path) -> Path:
+        """Lock file of a data file, keyed by its resolved path so equal names in different folders differ"""
+        resolved = str(path.resolve())
+        digest = hashlib.blake2b(resolved.encode("utf-8"), digest_size=8).hexdigest()
+        return self.lock_dir / f"{path.name}.{digest}.lock"
+
+    @contextmanager
+    def lock(self, path: Path):
+        """Hold an exclusive lock on ``path`` for the duration of the block.
+
+        The same thread may take the lock again while holding it; only the
+        outermost acquire and release touch the lock file.
+        """
+        lock_path = self.lock_file(path)
+        with _held_guard:
+            held = _held.setdefault(str(lock_path), _HeldLock())
+        with held.thread_lock:
+            if held.depth == 0:
+                self.lock_dir.mkdir(parents=True, exist_ok=True)
+                lock_file = open(lock_path, "a+b")
+                try:
+                    if fcntl is not None:
+                        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+                    else:
+                        lock_file.seek(0)
+                        msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+                except BaseException:
+                    lock_file.close()
+                    raise
+                held.file = lock_file
+            held.depth += 1
+            try:
+                yield
+            finally:
+                held.depth -= 1
+                if held.depth == 0:
+                    lock_file, held.file = held.file, None
+                    try:
+                        if fcntl is not None:
+                            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+                        else:
+                            lock_file.seek(0)
+                            msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+                    finally:
+                        lock_file.close()
+
+
+def atomic_write_text(path: Path, text: str) -> None:
+    """Write a file through a temporary file and an atomic rename"""
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class GenerationCounter:
+    """Per-key write counters shared by all worker processes through SQLite"""
+
+    def __init__(self, db_path: Path):
+        self.db_path = db_path
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS generations "
+                "(key TEXT PRIMARY KEY, value INTEGER NOT NULL)"
+            )
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> int:
+        row = self._connection().execute(
+            "SELECT value FROM generations WHERE key = ?", (key,)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def bump(self, key: str) -> int:
+        """Increment a counter and return its new value, atomically"""
+        conn = self._connection()
+        if sqlite3.sqlite_version_info >= (3, 35):
+            return conn.execute(
+                "INSERT INTO generations (key, value) VALUES (?, 1) "
+                "ON CONFLICT(key) DO UPDATE SET value = value + 1 RETURNING value",
+                (key,),
+            ).fetchone()[0]
+        # No RETURNING before SQLite 3.35: hold the write lock across both statements
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT INTO generations (key, value) VALUES (?, 1) "
+                "ON CONFLICT(key) DO UPDATE SET value = value + 1",
+                (key,),
+            )
+            value = self.get(key)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return value
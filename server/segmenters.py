@@ -0,0 +1,161 @@
+"""Transcript segmenters used by the ingestion pipeline.
+
+A segmenter turns a list of parsed messages ({speaker, timestamp, content})
+into segments ``{"start_index", "end_index", "title"}`` that together cover
+the whole transcript. ``get_segmenter`` resolves a name from ``SEGMENTERS``;
+other model clients can be plugged in without touching the pipeline by
+listing them in the ``SEGMENTER_PLUGINS`` environment variable as
+``name=package.module:factory``.
+"""
+import importlib
+import json
+import os
+from typing import Callable, Dict, List
+
+Segments = List[dict]
+
+
+def timestamp_seconds(timestamp: str) -> int:
+    """Convert an h:mm:ss / hh:mm:ss timestamp to seconds"""
+    seconds = 0
+    for part in timestamp.split(":"):
+        seconds = seconds * 60 + int(part)
+    return seconds
+
+
+def validate_segments(segments: Segments, message_count: int) -> Segments:
+    """Make segments contiguous and cover every message, as in segmentation.ipynb"""
+    segments = sorted(segments, key=lambda s: s["start_index"])
+    if not segments:
+        return [{"start_index": 0, "end_index": message_count - 1, "title": "Transcript"}]
+    segments[0]["start_index"] = 0
+    for i in range(len(segments) - 1):
+        segments[i]["end_index"] = segments[i + 1]["start_index"] - 1
+    segments[-1]["end_index"] = message_count - 1
+    return [s for s in segments if s["end_index"] >= s["start_index"]]
+
+
+class HeuristicSegmenter:
+    """Split at the longest pauses between consecutive messages.
+
+    The study sessions (introduction, three tasks, interview) are separated by
+    breaks in the conversation, so the ``segments - 1`` largest timestamp gaps
+    are good boundaries without calling a model.
+    """
+
+    def __init__(self, segments: int = 5, min_messages: int = 3):
+        self.segments = segments
+        self.min_messages = min_messages
+
+    def segment(self, messages: List[dict]) -> Segments:
+        count = len(messages)
+        seconds = [timestamp_seconds(m["timestamp"]) for m in messages]
+        gaps = sorted(
+            ((seconds[i] - seconds[i - 1], i) for i in range(1, count)),
+            reverse=True,
+        )
+
+        boundaries: List[int] = []
+        for _, index in gaps:
+            if len(boundaries) == self.segments - 1:
+                break
+            if index < self.min_messages or count - index < self.min_messages:
+                continue
+            if all(abs(index - b) >= self.min_messages for b in boundaries):
+                boundaries.append(index)
+
+        starts = [0] + sorted(boundaries)
+        return [
+            {
+                "start_index": start,
+                "end_index": (starts[i + 1] - 1) if i + 1 < len(starts) else count - 1,
+                "title": f"Segment {i + 1}",
+            }
+            for i, start in enumerate(starts)
+        ]
+
+
+def segmentation_prompt(messages_str: str) -> List[dict]:
+    return [
+        {
+            "role": "system",
+            "content": """You are a helpful assistant that segment transcripts.
+            The user will give you a transcript with indices for each message, and the criteria for segmentation.
+            You will follow the criteria to segment the transcript into sections, providing the start and end indices for each segment.
+            Reply in the following JSON format:
+            {
+                "segments": [
+                    {
+                        "start_index": <int>,
+                        "end_index": <int>,
+                        "title": "<str>"
+                    },
+                    ...
+                ]
+            }
+            """,
+        },
+        {
+            "role": "user",
+            "content": """
+            This transcript is from a user study. The study is divided into an introduction session, three scenario/task sessions, each followed by a brief questionnaire, and then a final interview session.
+            Here is the transcript:
+            {transcript}
+
+            Please segment the transcript into sections based on the following criteria:
+            - The first segment is the introduction, where one speaker introduces the topic and procedure.
+            - The second segment is the first scenario/task session with its questionnaire.
+            - The third segment is the second scenario/task session with its questionnaire.
+            - The fourth segment is the third scenario/task session with its questionnaire.
+            - The final segment is the interview session.
+            Return the segments in the specified JSON format.
+            The start and end indices must cover the entire transcript without gaps or overlaps.
+            """.format(transcript=messages_str),
+        },
+    ]
+
+
+class OpenAISegmenter:
+    """The model-based segmentation from segmentation.ipynb (needs the openai package)"""
+
+    def __init__(self, model: str = "gpt-4o-mini"):
+        from openai import OpenAI
+
+        self.client = OpenAI()
+        self.model = model
+
+    def segment(self, messages: List[dict]) -> Segments:
+        messages_str = "".join(
+            f"{index}: [{m['speaker']}] {m['content']}\n" for index, m in enumerate(messages)
+        )
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=segmentation_prompt(messages_str),
+            response_format={"type": "json_object"},
+            temperature=0,
+        )
+        return json.loads(response.choices[0].message.content)["segments"]
+
+
+SEGMENTERS: Dict[str, Callable[[], object]] = {
+    "heuristic": HeuristicSegmenter,
+    "openai": OpenAISegmenter,
+}
+
+
+def register_plugins(spec: str) -> None:
+    """Register segmenters from "name=package.module:factory,..." (the SEGMENTER_PLUGINS variable)"""
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, target = item.split("=", 1)
+        module_name, attr = target.split(":", 1)
+        SEGMENTERS[name.strip()] = getattr(importlib.import_module(module_name.strip()), attr.strip())
+
+
+register_plugins(os.environ.get("SEGMENTER_PLUGINS", ""))
+
+
+def get_segmenter(name: str):
+    """Instantiate a registered segmenter by name"""
+    if name not in SEGMENTERS:
+        raise ValueError(f"Unknown segmenter: {name}")
+    return SEGMENTERS[name]()
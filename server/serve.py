@@ -0,0 +1,50 @@
+"""Production entry point: several uvicorn workers, no auto-reload.
+
+`python app.py` stays the development entry point (single process, reload on
+change). This one starts N independent worker processes that share the data
+directory; writes are coordinated through the locks and generation counters in
+`locking.py`.
+
+    python serve.py --workers 4 --port 8000
+"""
+import argparse
+import os
+from pathlib import Path
+
+import uvicorn
+
+SERVER_DIR = Path(__file__).resolve().parent
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the Transcript Annotator API in production mode")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=int(os.environ.get("WEB_CONCURRENCY", os.cpu_count() or 1)),
+        help="Number of worker processes (default: $WEB_CONCURRENCY or CPU count)",
+    )
+    parser.add_argument(
+        "--data-dir",
+        default=str(SERVER_DIR),
+        help="Directory holding transcripts/, segmented/, annotations/ and cache/",
+    )
+    args = parser.parse_args()
+
+    # app.py resolves its data folders relative to the working directory
+    os.chdir(args.data_dir)
+    uvicorn.run(
+        "app:app",
+        app_dir=str(SERVER_DIR),
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        reload=False,
+        log_level="warning",
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+"""Similar-annotation lookup with MinHash signatures and LSH banding.
+
+Each annotation is reduced to the set of word shingles (3-grams) of its
+annotated message text and summarised by a MinHash signature, whose
+agreement rate estimates the Jaccard similarity of two shingle sets. The
+signatures are cut into bands; annotations sharing any band land in the same
+bucket, so a query only compares against the few candidates it collides with
+instead of every annotation in the corpus. The index is kept up to date one
+transcript at a time: unchanged annotations are skipped and only edited,
+added or removed ones are re-hashed.
+"""
+import re
+import threading
+import zlib
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+NUM_PERM = 128
+BANDS = 32  # 32 bands of 4 rows: pairs above ~0.4 Jaccard are likely to collide
+SHINGLE_SIZE = 3
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+AnnotationKey = Tuple[str, int]
+
+
+def annotation_text(annotation: dict) -> str:
+    """Text of the messages an annotation covers"""
+    return "\n".join(m.get("content", "") for m in annotation.get("annotated_messages") or [])
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> List[str]:
+    """Word n-grams of a text; short texts fall back to their words"""
+    tokens = TOKEN_PATTERN.findall(text.lower())
+    if len(tokens) < size:
+        return tokens
+    return [" ".join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)]
+
+
+class MinHasher:
+    """MinHash over 32-bit shingle hashes with NUM_PERM universal hash functions"""
+
+    def __init__(self, num_perm: int = NUM_PERM, seed: int = 1):
+        rng = np.random.RandomState(seed)
+        # a < 2**31 and hashes < 2**32 keep a * x + b inside uint64
+        self.a = rng.randint(1, 1 << 31, size=num_perm).astype(np.uint64)
+        self.b = rng.randint(0, 1 << 31, size=num_perm).astype(np.uint64)
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        grams = shingles(text)
+        if not grams:
+            return None
+        hashes = np.unique(
+            np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.uint64, count=len(grams))
+        )
+        return ((np.outer(hashes, self.a) + self.b) % MERSENNE_PRIME).min(axis=0)
+
+
+class SimilarityIndex:
+    """LSH index over the annotations of every transcript"""
+
+    def __init__(self, num_perm: int = NUM_PERM, bands: int = BANDS):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.hasher = MinHasher(num_perm)
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.buckets: List[Dict[bytes, set]] = [{} for _ in range(bands)]
+        self.entries: Dict[AnnotationKey, dict] = {}
+        self.transcript_keys: Dict[str, set] = {}
+        # Annotation file object each transcript was last indexed from
+        self.sources: Dict[str, dict] = {}
+        # Corpus-wide annotation write generation the index was last synced at
+        self.generation = -1
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def _band_keys(self, signature: np.ndarray) -> Iterable[Tuple[int, bytes]]:
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows].tobytes()
+
+    def _insert(self, key: AnnotationKey, entry: dict) -> None:
+        self.entries[key] = entry
+        self.transcript_keys.setdefault(key[0], set()).add(key)
+        if entry["signature"] is not None:
+            for band, band_key in self._band_keys(entry["signature"]):
+                self.buckets[band].setdefault(band_key, set()).add(key)
+
+    def _remove(self, key: AnnotationKey) -> None:
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return
+        keys = self.transcript_keys.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self.transcript_keys[key[0]]
+        if entry["signature"] is None:
+            return
+        for band, band_key in self._band_keys(entry["signature"]):
+            bucket = self.buckets[band].get(band_key)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self.buckets[band][band_key]
+
+    def update_transcript(self, name: str, data: Optional[dict]) -> None:
+        """Bring the entries of one transcript in line with its annotation file (None if deleted)"""
+        with self._lock:
+            if data is not None and self.sources.get(name) is data:
+                return
+            annotations = {
+                a["id"]: a for a in (data or {}).get("annotations", []) if a.get("id") is not None
+            }
+            for key in [k for k in self.transcript_keys.get(name, ()) if k[1] not in annotations]:
+                self._remove(key)
+
+            for annotation_id, annotation in annotations.items():
+                key = (name, annotation_id)
+                text = annotation_text(annotation)
+                entry = self.entries.get(key)
+                if entry is None or entry["text"] != text:
+                    self._remove(key)
+                    entry = {"text": text, "signature": self.hasher.signature(text)}
+                    self._insert(key, entry)
+                # Labels and categories change without touching the text
+                entry["label"] = annotation.get("label", "")
+                entry["description"] = annotation.get("description") or ""
+                entry["categories"] = list(annotation.get("categories") or [])
+
+            if data is None:
+                self.sources.pop(name, None)
+            else:
+                self.sources[name] = data
+
+    def sync(self, names: Iterable[str], load: Callable[[str], Optional[dict]]) -> None:
+        """Re-index transcripts whose annotation data changed, e.g. after another worker wrote them"""
+        names = set(names)
+        for name in names:
+            self.update_transcript(name, load(name))
+        with self._lock:
+            for name in [n for n in self.sources if n not in names]:
+                self.update_transcript(name, None)
+
+    def refresh(
+        self,
+        generation: Callable[[], int],
+        names: Callable[[], Iterable[str]],
+        load: Callable[[str], Optional[dict]],
+    ) -> None:
+        """Sync if the corpus-wide annotation generation moved since the last sync
+
+        The generation is read before any file is loaded, so a write that lands
+        during the sync leaves the index behind and is picked up next time.
+        """
+        with self._lock:
+            current = generation()
+            if current != self.generation:
+                self.sync(names(), load)
+                self.generation = current
+
+    def record_write(self, name: str, data: Optional[dict], bump: Callable[[], int]) -> None:
+        """Apply a local annotation write and the generation bump that announces it"""
+        with self._lock:
+            self.update_transcript(name, data)
+            current = bump()
+            if current == self.generation + 1:
+                # No other writer bumped in between, so the index is still complete
+                self.generation = current
+
+    def similar(self, key: AnnotationKey, k: int = 10, min_similarity: float = 0.0) -> dict:
+        """Top-k annotations sharing an LSH bucket with ``key`` and the categories they suggest"""
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                raise KeyError(key)
+            signature = entry["signature"]
+            candidates = set()
+            if signature is not None:
+                for band, band_key in self._band_keys(signature):
+                    candidates.update(self.buckets[band].get(band_key, ()))
+            candidates.discard(key)
+            candidates = sorted(candidates)
+            candidate_entries = [self.entries[c] for c in candidates]
+
+        neighbours = []
+        if candidates:
+            signatures = np.stack([e["signature"] for e in candidate_entries])
+            scores = (signatures == signature).mean(axis=1)
+            for i in np.argsort(-scores, kind="stable")[:k]:
+                if scores[i] < min_similarity:
+                    break
+                other = candidate_entries[i]
+                neighbours.append(
+                    {
+                        "transcriptFile": candidates[i][0],
+                        "annotationId": candidates[i][1],
+                        "label": other["label"],
+                        "description": other["description"],
+                        "categories": other["categories"],
+                        "similarity": round(float(scores[i]), 4),
+                    }
+                )
+
+        return {
+            "transcriptFile": key[0],
+            "annotationId": key[1],
+            "candidates": len(candidates),
+            "neighbours": neighbours,
+            "suggestedCategories": suggest_categories(neighbours, entry["categories"]),
+        }
+
+
+def suggest_categories(neighbours: List[dict], assigned: List[str]) -> List[dict]:
+    """Rank the neighbours' categories by similarity-weighted votes, skipping ones already assigned"""
+    total = sum(n["similarity"] for n in neighbours)
+    votes: Dict[str, List[float]] = {}
+    for n in neighbours:
+        for category in n["categories"]:
+            if category not in assigned:
+                votes.setdefault(category, []).append(n["similarity"])
+    suggestions = [
+        {
+            "category": category,
+            "score": round(sum(scores) / total, 4) if total else 0.0,
+            "support": len(scores),
+        }
+        for category, scores in votes.items()
+    ]
+    return sorted(suggestions, key=lambda s: (-s["score"], s["category"]))
@@ -0,0 +1,130 @@
+"""Speaker and time-range index over the messages of a transcript.
+
+Message timestamps are converted to seconds once and kept in a sorted array
+together with the matching global message indices, and every speaker gets
+its own sorted posting list. A query for "what speaker X said between
+``from`` and ``to``" is then two binary searches on one posting list. The
+per-speaker time spans (a ``TimeSummary``, small enough to keep for every
+transcript and to store in the index snapshot) let corpus-wide queries skip
+transcripts that cannot match without loading their messages.
+"""
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from segmenters import timestamp_seconds
+
+TIME_PATTERN = re.compile(r"^\d{1,2}(:\d{2}){0,2}$")
+
+
+def speaker_key(speaker: str) -> str:
+    """Speakers are matched case-insensitively and ignoring surrounding whitespace"""
+    return speaker.strip().lower()
+
+
+def parse_time(value: str) -> int:
+    """Seconds for an hh:mm:ss, mm:ss or ss query value"""
+    value = value.strip()
+    # Minutes and seconds after the leading part must be below 60
+    if not TIME_PATTERN.match(value) or any(int(part) >= 60 for part in value.split(":")[1:]):
+        raise ValueError(f"Invalid time: {value!r}, expected hh:mm:ss")
+    return timestamp_seconds(value)
+
+
+class TimeSummary:
+    """First and last timestamp (seconds) of every speaker of a transcript, plus their display names"""
+
+    def __init__(self, spans: Dict[str, Tuple[int, int]], names: Dict[str, str]):
+        self.spans = spans
+        self.names = names  # speaker key -> speaker as written in the transcript
+        self.all = (
+            (min(first for first, _ in spans.values()), max(last for _, last in spans.values()))
+            if spans else None
+        )
+
+    def may_match(
+        self, speakers: Optional[Iterable[str]] = None, start: Optional[int] = None, end: Optional[int] = None
+    ) -> bool:
+        """Cheap check whether a query can have results, using only the speaker spans"""
+        if speakers is None:
+            spans = [self.all] if self.all is not None else []
+        else:
+            spans = [self.spans[k] for k in speakers if k in self.spans]
+        return any(
+            (start is None or last >= start) and (end is None or first <= end) for first, last in spans
+        )
+
+    def to_json(self) -> dict:
+        return {"spans": {k: list(span) for k, span in self.spans.items()}, "names": self.names}
+
+    @classmethod
+    def from_json(cls, data: dict) -> "TimeSummary":
+        return cls({k: (first, last) for k, (first, last) in data["spans"].items()}, data["names"])
+
+
+class PostingList:
+    """Global message indices sorted by timestamp (then by index)"""
+
+    def __init__(self, seconds: np.ndarray, indices: np.ndarray):
+        order = np.lexsort((indices, seconds))
+        self.seconds = seconds[order]
+        self.indices = indices[order]
+
+    def __len__(self) -> int:
+        return len(self.indices)
+
+    def span(self) -> Tuple[int, int]:
+        return int(self.seconds[0]), int(self.seconds[-1])
+
+    def range(self, start: Optional[int] = None, end: Optional[int] = None) -> np.ndarray:
+        """Indices of messages with start <= seconds <= end"""
+        lo = 0 if start is None else np.searchsorted(self.seconds, start, side="left")
+        hi = len(self.seconds) if end is None else np.searchsorted(self.seconds, end, side="right")
+        return self.indices[lo:hi]
+
+
+class TranscriptTimeIndex:
+    """Time-sorted message arrays of one transcript plus per-speaker posting lists"""
+
+    def __init__(self, messages: Dict[int, dict]):
+        indices, seconds, speakers = [], [], []
+        self.names: Dict[str, str] = {}  # speaker key -> speaker as written in the transcript
+        for index, msg in messages.items():
+            try:
+                seconds.append(timestamp_seconds(msg["timestamp"]))
+            except (KeyError, ValueError, AttributeError):
+                continue  # Messages without a usable timestamp can only be addressed by index
+            indices.append(index)
+            speakers.append(speaker_key(msg.get("speaker", "")))
+            self.names.setdefault(speakers[-1], msg.get("speaker", ""))
+
+        index_array = np.array(indices, dtype=np.int64)
+        second_array = np.array(seconds, dtype=np.int64)
+        self.all = PostingList(second_array, index_array)
+
+        speaker_array = np.array(speakers, dtype=object)
+        self.speakers: Dict[str, PostingList] = {}
+        for key in sorted(set(speakers)):
+            mask = speaker_array == key
+            self.speakers[key] = PostingList(second_array[mask], index_array[mask])
+
+        self.summary = TimeSummary(
+            {key: postings.span() for key, postings in self.speakers.items()}, self.names
+        )
+
+    def may_match(
+        self, speakers: Optional[Iterable[str]] = None, start: Optional[int] = None, end: Optional[int] = None
+    ) -> bool:
+        return self.summary.may_match(speakers, start, end)
+
+    def query(
+        self, speakers: Optional[Iterable[str]] = None, start: Optional[int] = None, end: Optional[int] = None
+    ) -> List[int]:
+        """Global indices, in transcript order, of messages by ``speakers`` (keys) between start and end"""
+        if speakers is None:
+            found = self.all.range(start, end)
+        else:
+            parts = [self.speakers[k].range(start, end) for k in speakers if k in self.speakers]
+            found = np.concatenate(parts) if parts else np.empty(0, dtype=np.int64)
+        return np.sort(found).tolist()
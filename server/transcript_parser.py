@@ -0,0 +1,124 @@
+"""Streaming parser for raw `.txt` transcripts.
+
+A transcript is a sequence of messages, each starting with a header line
+``[Speaker Name] hh:mm:ss`` followed by its content lines. Lines before the
+first header are ignored, every line is stripped, and messages whose content
+is empty are dropped.
+
+``iter_messages`` consumes any iterable of lines (an open file handle, a
+list, ...) and yields lightweight ``MessageRecord`` tuples as soon as each
+message is complete, so large files never need to be loaded whole.
+``iter_message_chunks`` batches those records for bulk processing. Both the
+API and the segmentation notebook use this module.
+"""
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Iterable, Iterator, List, NamedTuple, Optional
+
+SPEAKER_PATTERN = re.compile(r"^\[([^\]]+)\]\s+(\d{1,2}:\d{2}:\d{2})$")
+
+
+class MessageRecord(NamedTuple):
+    speaker: str
+    timestamp: str
+    content: str
+
+
+def iter_messages(lines: Iterable[str]) -> Iterator[MessageRecord]:
+    """Yield messages from an iterable of transcript lines"""
+    match_header = SPEAKER_PATTERN.match
+    speaker = timestamp = None
+    content: List[str] = []
+
+    for line in lines:
+        line = line.strip()
+
+        # Only lines starting with "[" can be headers, skip the regex otherwise
+        header = match_header(line) if line[:1] == "[" else None
+        if header is not None:
+            if speaker is not None:
+                text = "\n".join(content).strip()
+                if text:  # Only yield messages with actual content
+                    yield MessageRecord(speaker, timestamp, text)
+            speaker, timestamp = header.groups()
+            content = []
+        elif speaker is not None:
+            content.append(line)
+
+    # Don't forget the last message
+    if speaker is not None:
+        text = "\n".join(content).strip()
+        if text:
+            yield MessageRecord(speaker, timestamp, text)
+
+
+def iter_message_chunks(lines: Iterable[str], chunk_size: int = 1000) -> Iterator[List[MessageRecord]]:
+    """Yield lists of at most ``chunk_size`` messages"""
+    chunk: List[MessageRecord] = []
+    for record in iter_messages(lines):
+        chunk.append(record)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def parse_transcript(content: str) -> List[MessageRecord]:
+    """Parse transcript content held in memory into messages"""
+    return list(iter_messages(content.split("\n")))
+
+
+def parse_file(path: Path) -> List[MessageRecord]:
+    """Parse a transcript file, reading it line by line"""
+    with open(path, "r", encoding="utf-8") as f:
+        return list(iter_messages(f))
+
+
+def file_hash(path: Path) -> str:
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ParseCache:
+    """LRU cache of parsed transcripts keyed by file content hash.
+
+    The hash of a path is remembered together with its mtime/size, so an
+    unchanged file is neither re-hashed nor re-parsed, and identical content
+    under different names is parsed once.
+    """
+
+    def __init__(self, max_entries: int = 64):
+        self.max_entries = max_entries
+        self._parsed: "OrderedDict[str, List[MessageRecord]]" = OrderedDict()
+        self._hashes = {}
+        self._lock = threading.Lock()
+
+    def get(self, path: Path) -> List[MessageRecord]:
+        """Return the parsed messages of a file; the list must not be modified"""
+        stat = path.stat()
+        signature = (stat.st_mtime_ns, stat.st_size)
+        known = self._hashes.get(path)
+        digest: Optional[str] = known[1] if known and known[0] == signature else None
+        if digest is None:
+            digest = file_hash(path)
+            self._hashes[path] = (signature, digest)
+
+        with self._lock:
+            messages = self._parsed.get(digest)
+            if messages is not None:
+                self._parsed.move_to_end(digest)
+                return messages
+
+        messages = parse_file(path)
+        with self._lock:
+            self._parsed[digest] = messages
+            while len(self._parsed) > self.max_entries:
+                self._parsed.popitem(last=False)
+        return messages